@@ -2,50 +2,203 @@ import numpy as np
 import matplotlib.pyplot as plt
 import random
 import math
+import time
 import P1_BIM as BIM
+import P2_collision as CC
 from matplotlib.patches import Polygon
 
-class Node:
-    def __init__(self, point):
-        self.point = point
-        self.parent = None
-        self.cost = 0
+class ArrayTree:
+    """Compact RRT* tree: coordinates, parent indices and costs in preallocated arrays grown in chunks."""
+    def __init__(self, chunk_size=1024):
+        self.chunk_size = chunk_size
+        self.points = np.empty((chunk_size, 2))
+        self.parents = np.full(chunk_size, -1, dtype=np.int64)
+        self.costs = np.zeros(chunk_size)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, point, parent=-1, cost=0.0):
+        if self.size == len(self.points):
+            grow = self.chunk_size
+            self.points = np.vstack([self.points, np.empty((grow, 2))])
+            self.parents = np.concatenate([self.parents, np.full(grow, -1, dtype=np.int64)])
+            self.costs = np.concatenate([self.costs, np.zeros(grow)])
+        index = self.size
+        self.points[index] = point
+        self.parents[index] = parent
+        self.costs[index] = cost
+        self.size += 1
+        return index
+
+    def point(self, index):
+        return self.points[index].tolist()
+
+    def path_to(self, index):
+        # Follow the parent indices back to the root
+        path = []
+        while index != -1:
+            path.append(self.point(index))
+            index = int(self.parents[index])
+        return path[::-1]
+
+class SpatialGrid:
+    """Uniform grid over the tree nodes for fast nearest-neighbour and radius queries."""
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        # Range of occupied cells, bounds the ring search in nearest()
+        self.min_cell = None
+        self.max_cell = None
+
+    def cell_of(self, point):
+        return (int(math.floor(point[0] / self.cell_size)), int(math.floor(point[1] / self.cell_size)))
+
+    def insert(self, index, point):
+        cell = self.cell_of(point)
+        self.cells.setdefault(cell, []).append((index, point[0], point[1]))
+        if self.min_cell is None:
+            self.min_cell, self.max_cell = cell, cell
+        else:
+            self.min_cell = (min(self.min_cell[0], cell[0]), min(self.min_cell[1], cell[1]))
+            self.max_cell = (max(self.max_cell[0], cell[0]), max(self.max_cell[1], cell[1]))
+
+    def ring(self, center, r):
+        # Cells at Chebyshev distance exactly r from the center cell
+        cx, cy = center
+        if r == 0:
+            yield center
+            return
+        for dx in range(-r, r + 1):
+            yield (cx + dx, cy - r)
+            yield (cx + dx, cy + r)
+        for dy in range(-r + 1, r):
+            yield (cx - r, cy + dy)
+            yield (cx + r, cy + dy)
+
+    def nearest(self, point):
+        if self.min_cell is None:
+            return None
+        center = self.cell_of(point)
+        # Beyond this ring every occupied cell has been visited
+        max_ring = max(abs(center[0] - self.min_cell[0]), abs(center[0] - self.max_cell[0]),
+                       abs(center[1] - self.min_cell[1]), abs(center[1] - self.max_cell[1]))
+        best_index = None
+        best_dist = float('inf')
+        for r in range(max_ring + 1):
+            for cell in self.ring(center, r):
+                for index, x, y in self.cells.get(cell, ()):
+                    d = math.hypot(x - point[0], y - point[1])
+                    if d < best_dist:
+                        best_index, best_dist = index, d
+            # Nodes outside ring r are at least r cells away from the point
+            if best_dist <= r * self.cell_size:
+                break
+        return best_index
+
+    def within(self, point, radius):
+        x0, y0 = self.cell_of((point[0] - radius, point[1] - radius))
+        x1, y1 = self.cell_of((point[0] + radius, point[1] + radius))
+        result = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for index, x, y in self.cells.get((cx, cy), ()):
+                    if math.hypot(x - point[0], y - point[1]) < radius:
+                        result.append(index)
+        return result
 
 class RRTStar:
-    def __init__(self, start, goal, obstacle, boundary, max_iter=10000, goal_radius=20, step_size=10, search_radius=10):
+    def __init__(self, start, goal, obstacle, boundary, max_iter=10000, goal_radius=20, step_size=10, search_radius=10,
+                 collision_checker=None, seed=None, anytime=False, time_budget=None, sample_margin=None,
+                 collision_cache=None):
         self.max_iter = max_iter
         self.goal_radius = goal_radius
         self.step_size = step_size
         self.search_radius = search_radius
+
+        # Anytime mode keeps refining the solution until max_iter or time_budget (seconds) is spent
+        self.anytime = anytime
+        self.time_budget = time_budget
+        # Sample only in the box around start and goal grown by this margin, None samples the whole boundary
+        self.sample_margin = sample_margin
+        self.best_cost = float('inf')
+        self.iterations = 0
+        self.collision_checks = 0
         
         # Define the graph's boundary and obstacles
         self.boundary = boundary  # boundary = (x_min, x_max, y_min, y_max)
         self.obstacle = obstacle  # List of obstacle coordinates or areas
+        self.collision = collision_checker  # Geometric collision backend, may be shared between planners
+        self.collision_cache = collision_cache  # LRU of segment outcomes, may be shared between planners
+        self.random = random.Random(seed)  # Own generator so seeded runs are reproducible, also across processes
         
-        # Initialize start and goal nodes
-        self.start_node = Node(start)
-        self.goal_node = Node(goal)
-        self.tree = [self.start_node]
+        # Initialize the tree with the start node, the goal node index is set once the goal is reached
+        self.start = list(start)
+        self.goal = list(goal)
+        self.tree = ArrayTree()
+        self.start_node = self.tree.add(self.start)
+        self.goal_node = None
+        self.check_goal_edge = False  # Set for trees reused across goals by plan_to
+
+        # Spatial index kept in sync with self.tree, replaces linear scans over the tree
+        self.index = SpatialGrid(cell_size=max(search_radius, step_size) * 2)
+        self.index.insert(self.start_node, self.start)
 
     @staticmethod
     def distance(p1, p2):
         return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
 
-    def random_point(self):
+    def sampling_box(self):
+        if self.sample_margin is None:
+            return self.boundary
         x_min, x_max, y_min, y_max = self.boundary
-        ptrand = (random.randint(x_min, x_max), random.randint(y_min, y_max))
+        return (max(x_min, int(math.floor(min(self.start[0], self.goal[0]) - self.sample_margin))),
+                min(x_max, int(math.ceil(max(self.start[0], self.goal[0]) + self.sample_margin))),
+                max(y_min, int(math.floor(min(self.start[1], self.goal[1]) - self.sample_margin))),
+                min(y_max, int(math.ceil(max(self.start[1], self.goal[1]) + self.sample_margin))))
+
+    def random_point(self):
+        x_min, x_max, y_min, y_max = self.sampling_box()
+        ptrand = (self.random.randint(x_min, x_max), self.random.randint(y_min, y_max))
         return ptrand
 
+    def informed_point(self, c_best):
+        # Uniform sample from the ellipse with foci start and goal that holds every shorter path
+        c_min = self.distance(self.start, self.goal)
+        a = c_best / 2
+        b = math.sqrt(max(c_best ** 2 - c_min ** 2, 0.0)) / 2
+        r = math.sqrt(self.random.random())
+        theta = self.random.uniform(0, 2 * math.pi)
+        x, y = a * r * math.cos(theta), b * r * math.sin(theta)
+        angle = math.atan2(self.goal[1] - self.start[1], self.goal[0] - self.start[0])
+        cx, cy = (self.start[0] + self.goal[0]) / 2, (self.start[1] + self.goal[1]) / 2
+        return (cx + x * math.cos(angle) - y * math.sin(angle), cy + x * math.sin(angle) + y * math.cos(angle))
+
+    def sample(self):
+        if self.best_cost < float('inf'):
+            return self.informed_point(self.best_cost)
+        return self.random_point()
+
     def nearest(self, point):
-        return min(self.tree, key=lambda node: self.distance(node.point, point))
+        return self.index.nearest(point)
 
     def set_obstacles(self, polygon_points):
         self.obstacle = []
         for points in polygon_points:
             polygon = Polygon(points, closed=True, fill=None, edgecolor='black')
             self.obstacle.append(polygon)
+        if self.collision is None:
+            self.collision = CC.CollisionChecker(polygon_points)
 
     def is_collision_free(self, p1, p2):
+        self.collision_checks += 1
+        if self.collision is not None:
+            if self.collision_cache is not None:
+                return self.collision_cache.lookup(p1, p2, self.collision.is_collision_free)
+            return self.collision.is_collision_free(p1, p2)
+
+        # Fallback when no collision backend is set: sample the segment against the patches
         num_points = int(self.distance(p1, p2) / 2)  # Increase for less detail
         for i in range(num_points):
             u = i / num_points
@@ -56,28 +209,70 @@ class RRTStar:
         return True
 
     def nearby_nodes(self, point, radius):
-        return [node for node in self.tree if self.distance(node.point, point) < radius]
+        return self.index.within(point, radius)
+
+    def add_node(self, point, parent):
+        cost = self.tree.costs[parent] + self.distance(self.tree.points[parent], point)
+        index = self.tree.add(point, parent, cost)
+        self.index.insert(index, point)
+        return index
+
+    def path_cost(self, index):
+        # Rewiring does not update the costs of descendants, so measure along the parent chain
+        cost = 0.0
+        parent = int(self.tree.parents[index])
+        while parent != -1:
+            cost += self.distance(self.tree.points[index], self.tree.points[parent])
+            index, parent = parent, int(self.tree.parents[parent])
+        return cost
+
+    def goal_cost(self, index):
+        if not self.is_collision_free(self.tree.points[index], self.goal):
+            return float('inf')
+        return self.path_cost(index) + self.distance(self.tree.points[index], self.goal)
+
+    def connect_goal(self):
+        # Attach the goal to the cheapest collision-free node within the goal radius
+        candidates = self.nearby_nodes(self.goal, self.goal_radius)
+        if not candidates:
+            return
+        costs = [self.goal_cost(index) for index in candidates]
+        best = int(np.argmin(costs))
+        if costs[best] < float('inf'):
+            self.best_cost = costs[best]
+            self.goal_node = self.add_node(self.goal, candidates[best])
 
     def rewire(self, new_node, nearby_nodes):
-        for node in nearby_nodes:
-            if node is not new_node.parent:
-                new_cost = new_node.cost + self.distance(new_node.point, node.point)
-                if new_cost < node.cost and self.is_collision_free(new_node.point, node.point):
-                    node.parent = new_node
-                    node.cost = new_cost
+        if not nearby_nodes:
+            return
+        # Costs through the new node for all nearby nodes at once
+        near = np.array(nearby_nodes)
+        new_point = self.tree.points[new_node]
+        new_costs = self.tree.costs[new_node] + np.linalg.norm(self.tree.points[near] - new_point, axis=1)
+        candidates = (new_costs < self.tree.costs[near]) & (near != self.tree.parents[new_node])
+        for node, new_cost in zip(near[candidates], new_costs[candidates]):
+            if self.is_collision_free(new_point, self.tree.points[node]):
+                self.tree.parents[node] = new_node
+                self.tree.costs[node] = new_cost
 
     def rrt_star(self):
+        start_time = time.perf_counter()
         for i in range(self.max_iter):
+            if self.time_budget is not None and time.perf_counter() - start_time > self.time_budget:
+                break
+            self.iterations = i + 1
+
             # Generate a random point
-            rand_point = self.random_point()
-            if random.random() < 0.15:  # Goal bias
-                rand_point = self.goal_node.point
+            rand_point = self.sample()
+            if self.random.random() < 0.15:  # Goal bias
+                rand_point = self.goal
 
             # Find the nearest node to the random point
             nearest_node = self.nearest(rand_point)
+            nearest_point = self.tree.points[nearest_node]
 
             # Calculate direction to the random point
-            direction = [rand_point[0] - nearest_node.point[0], rand_point[1] - nearest_node.point[1]]
+            direction = [rand_point[0] - nearest_point[0], rand_point[1] - nearest_point[1]]
             norm = (direction[0]**2 + direction[1]**2) ** 0.5
             
             if norm < 1e-6:
@@ -85,51 +280,99 @@ class RRTStar:
 
             # Normalize direction
             direction = [direction[0] / norm, direction[1] / norm]
-            new_point = [int(round(nearest_node.point[0] + direction[0] * self.step_size)),
-                        int(round(nearest_node.point[1] + direction[1] * self.step_size))]
+            new_point = [int(round(nearest_point[0] + direction[0] * self.step_size)),
+                        int(round(nearest_point[1] + direction[1] * self.step_size))]
 
             # Check bounds and collisions
             if (self.boundary[0] <= new_point[0] <= self.boundary[1] and
                 self.boundary[2] <= new_point[1] <= self.boundary[3] and
-                self.is_collision_free(nearest_node.point, new_point)):
+                self.is_collision_free(nearest_point, new_point)):
                 
                 # Create a new node at new_point
-                new_node = Node(new_point)
-                new_node.parent = nearest_node
-                new_node.cost = nearest_node.cost + self.distance(nearest_node.point, new_point)
-                self.tree.append(new_node)
+                new_node = self.add_node(new_point, nearest_node)
 
                 # Rewire the tree
                 near_nodes = self.nearby_nodes(new_point, self.search_radius)
                 self.rewire(new_node, near_nodes)
 
                 # Check if the goal is reached
-                if self.distance(new_point, self.goal_node.point) < self.goal_radius:
-                    self.goal_node.parent = new_node
-                    self.goal_node.cost = new_node.cost + self.distance(new_point, self.goal_node.point)
-                    self.tree.append(self.goal_node)
-                    print(f"Goal reached at iteration {i}")
-                    break
+                if self.distance(new_point, self.goal) < self.goal_radius * (2 if self.check_goal_edge else 1):
+                    if not self.anytime:
+                        # The goal edge stays in a reused tree, so there it has to be free, from a bit further away
+                        if self.check_goal_edge and not self.is_collision_free(new_point, self.goal):
+                            continue
+                        self.goal_node = self.add_node(self.goal, new_node)
+                        print(f"Goal reached at iteration {i}")
+                        break
+
+                    # Keep refining, from now on only samples that can shorten the path are drawn
+                    cost = self.goal_cost(new_node)
+                    if cost < self.best_cost:
+                        if self.best_cost == float('inf'):
+                            print(f"Goal reached at iteration {i}, refining")
+                        self.best_cost = cost
+
+        if self.anytime:
+            self.connect_goal()
+            print(f"Best path cost {self.best_cost:.1f} after {self.iterations} iterations")
 
         return self.tree, self.goal_node
 
     def extract_path(self):
-        path = []
-        node = self.goal_node
-        while node:
-            path.append(node.point)
-            node = node.parent
-        return path[::-1]  # Reverse the path
+        # Without a solution only the goal itself is returned
+        if self.goal_node is None:
+            return [self.goal]
+        return self.tree.path_to(self.goal_node)
 
-    def smooth_path(self, path):
+    def smooth_path(self, path, mode="greedy"):
+        """Shortcut the path. 'greedy' tries every later waypoint from the end backwards for each
+        anchor; 'bisect' finds the farthest visible waypoint with a galloping binary search, which
+        bounds the collision checks per anchor to O(log n)."""
+        if mode == "bisect":
+            return self.smooth_path_bisect(path)
         smoothed_path = [path[0]]
         i = 0
         while i < len(path) - 1:
             for j in range(len(path) - 1, i, -1):
                 if self.is_collision_free(path[i], path[j]):
-                    smoothed_path.append(path[j])
-                    i = j
                     break
+            # j ends at i + 1 when nothing is visible, so the next waypoint is always kept
+            smoothed_path.append(path[j])
+            i = j
+        return smoothed_path
+
+    def smooth_path_bisect(self, path):
+        visibility = {}
+
+        def visible(i, j):
+            # Memoized, the search probes the same pairs more than once
+            if (i, j) not in visibility:
+                visibility[(i, j)] = self.is_collision_free(path[i], path[j])
+            return visibility[(i, j)]
+
+        last = len(path) - 1
+        smoothed_path = [path[0]]
+        i = 0
+        while i < last:
+            if visible(i, last):
+                j = last
+            else:
+                # Gallop to bracket the farthest visible waypoint, then bisect inside the bracket
+                lo, step = i + 1, 1
+                hi = min(i + 2, last)
+                while hi < last and visible(i, hi):
+                    lo = hi
+                    step *= 2
+                    hi = min(i + 1 + step, last)
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if visible(i, mid):
+                        lo = mid
+                    else:
+                        hi = mid
+                j = lo
+            smoothed_path.append(path[j])
+            i = j
         return smoothed_path
 
     def rrt_star_with_smoothing(self, smooth=True):
@@ -145,6 +388,36 @@ class RRTStar:
         
         return path
 
+    def plan(self, smooth=True):
+        # Common entry point shared by all lower-level planners
+        return self.rrt_star_with_smoothing(smooth=smooth)
+
+    def set_goal(self, goal):
+        """Point the planner at a new goal while keeping the tree grown so far (multi-query)."""
+        self.goal = list(goal)
+        self.goal_node = None
+        self.best_cost = float('inf')
+        # Statistics count the work of this query only
+        self.iterations = 0
+        self.collision_checks = 0
+
+    def plan_to(self, goal, smooth=True):
+        """Answer a new goal from the existing tree: a node near the goal that sees it is used
+        directly, otherwise the tree is extended until it reaches the goal."""
+        self.set_goal(goal)
+        self.check_goal_edge = True
+        if not self.anytime:
+            self.connect_goal()
+        if self.goal_node is None:
+            self.rrt_star()
+        path = self.extract_path()
+        if smooth:
+            path = self.smooth_path(path)
+        return path
+
+    def stats(self):
+        return {"iterations": self.iterations, "tree_size": len(self.tree), "collision_checks": self.collision_checks}
+
     def calculate_path_length(self, path):
         length = 0.0
         for i in range(1, len(path)):
@@ -177,6 +450,87 @@ class RRTStar:
         plt.axis('equal')
         plt.show()
 
+class RRTConnect(RRTStar):
+    """Bidirectional RRT-Connect: grows trees from both endpoints and connects them greedily."""
+    def __init__(self, start, goal, obstacle, boundary, **kwargs):
+        super().__init__(start, goal, obstacle, boundary, **kwargs)
+        self.goal_tree = ArrayTree()
+        self.goal_index = SpatialGrid(cell_size=max(self.search_radius, self.step_size) * 2)
+        self.goal_index.insert(self.goal_tree.add(self.goal), self.goal)
+        self.path = None
+
+    def steer(self, from_point, to_point):
+        # Step towards to_point, landing exactly on it when it is within one step
+        d = self.distance(from_point, to_point)
+        if d <= self.step_size:
+            return list(to_point), True
+        return [int(round(from_point[0] + (to_point[0] - from_point[0]) / d * self.step_size)),
+                int(round(from_point[1] + (to_point[1] - from_point[1]) / d * self.step_size))], False
+
+    def extend(self, tree, index, point):
+        """Take one step from the nearest node of tree towards point, None when trapped."""
+        nearest_node = index.nearest(point)
+        nearest_point = tree.points[nearest_node]
+        if self.distance(nearest_point, point) < 1e-6:
+            return nearest_node, True
+        new_point, reached = self.steer(nearest_point, point)
+        if not (self.boundary[0] <= new_point[0] <= self.boundary[1] and
+                self.boundary[2] <= new_point[1] <= self.boundary[3] and
+                self.is_collision_free(nearest_point, new_point)):
+            return None, False
+        new_node = tree.add(new_point, nearest_node, tree.costs[nearest_node] + self.distance(nearest_point, new_point))
+        index.insert(new_node, new_point)
+        return new_node, reached
+
+    def connect(self, tree, index, point):
+        # Keep extending towards point until it is reached or the tree is trapped
+        while True:
+            node, reached = self.extend(tree, index, point)
+            if node is None or reached:
+                return node, reached
+
+    def rrt_connect(self):
+        trees = [(self.tree, self.index), (self.goal_tree, self.goal_index)]
+        for i in range(self.max_iter):
+            self.iterations = i + 1
+            (tree_a, index_a), (tree_b, index_b) = trees
+
+            new_node, _ = self.extend(tree_a, index_a, self.random_point())
+            if new_node is not None:
+                other_node, reached = self.connect(tree_b, index_b, tree_a.points[new_node])
+                if reached:
+                    path_a = tree_a.path_to(new_node)
+                    path_b = tree_b.path_to(other_node)[::-1][1:]
+                    self.path = path_a + path_b if tree_a is self.tree else (path_a + path_b)[::-1]
+                    print(f"Trees connected at iteration {i}")
+                    break
+
+            # Alternate which tree explores and which one connects
+            trees.reverse()
+        return self.path
+
+    def extract_path(self):
+        if self.path is None:
+            return [self.goal]
+        return self.path
+
+    def stats(self):
+        stats = super().stats()
+        stats["tree_size"] += len(self.goal_tree)
+        return stats
+
+    def plan(self, smooth=True):
+        self.rrt_connect()
+        path = self.extract_path()
+        if smooth:
+            path = self.smooth_path(path)
+        return path
+
+def path_length(path):
+    if len(path) < 2:
+        return 0.0
+    return float(np.sum(np.linalg.norm(np.diff(np.asarray(path, dtype=float), axis=0), axis=1)))
+
 # # For local usage
 # if __name__ == "__main__":
 #     # Define start and goal points
@@ -1,12 +1,23 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 import math
+import os
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
 import P1_BIM as BIM
+from P2_cache import CACHE_DIR, params_hash
 
 class NodeLocator:
-    def __init__(self, nodes):
-        """Initialize the locator with a dictionary of nodes."""
+    def __init__(self, nodes, collision_checker=None):
+        """Initialize the locator with a dictionary of nodes, indexed in a KD-tree.
+        The collision checker is only needed to filter nodes by reachability."""
         self.nodes = nodes
+        self.node_ids = list(nodes)
+        self.points = np.array([nodes[node] for node in self.node_ids], dtype=float).reshape(-1, 2)
+        self.kdtree = cKDTree(self.points)
+        self.collision = collision_checker
 
     def calculate_distance(self, location, node):
         """Calculate the Euclidean distance between the given location and a node."""
@@ -16,23 +27,57 @@ class NodeLocator:
 
     def find_closest_node(self, location):
         """Find the closest node to the given location."""
-        closest_node = None
-        min_distance = float('inf')
+        distance, index = self.kdtree.query(location)
+        closest_node = self.node_ids[index]
+        return closest_node, self.nodes[closest_node], float(distance)
 
-        for node in self.nodes:
-            distance = self.calculate_distance(location, node)
-            if distance < min_distance:
-                min_distance = distance
-                closest_node = node
+    def find_k_nearest(self, locations, k=1, reachable=False):
+        """Find the k nearest nodes for many locations at once.
+        Returns a list per location of (node, coordinates, distance) tuples, closest first.
+        With reachable=True only nodes without a wall between them and the location are kept,
+        so fewer than k nodes may be returned."""
+        if reachable and self.collision is None:
+            raise ValueError("Filtering by reachability needs a NodeLocator created with a collision_checker")
+        locations = np.asarray(locations, dtype=float).reshape(-1, 2)
+        n_nodes = len(self.node_ids)
+        # Walls hide some of the nearest nodes, so query more candidates than needed
+        n_query = min(k * 4 if reachable else k, n_nodes)
+        distances, indices = self.kdtree.query(locations, k=n_query)
+        distances, indices = distances.reshape(len(locations), -1), indices.reshape(len(locations), -1)
 
-        return closest_node, self.nodes[closest_node], min_distance
+        results = []
+        for location, row_distances, row_indices in zip(locations, distances, indices):
+            nearest = self.nearest_from(location, row_distances, row_indices, k, reachable)
+            if reachable and len(nearest) < k and n_query < n_nodes:
+                # Not enough visible candidates, fall back to checking every node by distance
+                all_distances, all_indices = self.kdtree.query(location, k=n_nodes)
+                nearest = self.nearest_from(location, all_distances, all_indices, k, reachable)
+            results.append(nearest)
+        return results
+
+    def nearest_from(self, location, distances, indices, k, reachable):
+        nearest = []
+        for distance, index in zip(np.atleast_1d(distances), np.atleast_1d(indices)):
+            if reachable and not self.collision.is_collision_free(location.tolist(), self.points[index].tolist()):
+                continue
+            node = self.node_ids[index]
+            nearest.append((node, self.nodes[node], float(distance)))
+            if len(nearest) == k:
+                break
+        return nearest
 
 class GraphAnalyzer:
-    def __init__(self, nodes, connections):
-        """Initialize the graph with nodes and connections."""
+    def __init__(self, nodes, connections, use_cache=True):
+        """Initialize the graph with nodes and connections.
+        All-pairs distances and predecessors are computed once on the first query and stored in the cache."""
         self.G = nx.Graph()
         self.add_nodes(nodes)
         self.add_connections(connections)
+        self.use_cache = use_cache
+        self.node_ids = list(self.G.nodes)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.distances = None  # distances[i, j]: shortest path length between node_ids[i] and node_ids[j]
+        self.predecessors = None  # predecessors[i, j]: node index before j on the path from i, -9999 without path
 
     def add_nodes(self, nodes):
         """Add nodes with coordinates to the graph."""
@@ -47,13 +92,51 @@ class GraphAnalyzer:
                     target_node, weight = conn
                     self.G.add_edge(node, target_node, weight=weight)
 
+    def cache_file(self):
+        edges = sorted((self.index[u], self.index[v], float(w)) for u, v, w in self.G.edges(data='weight'))
+        key = params_hash([str(node) for node in self.node_ids], edges)
+        return os.path.join(CACHE_DIR, f"door_distances_{key}.npz")
+
+    def compute_all_pairs(self):
+        """Distance and predecessor matrices of all node pairs, with Dijkstra from every node."""
+        if self.distances is not None:
+            return self.distances
+        file_path = self.cache_file() if self.use_cache else None
+        if file_path and os.path.exists(file_path):
+            data = np.load(file_path)
+            self.distances, self.predecessors = data["distances"], data["predecessors"]
+            return self.distances
+
+        n = len(self.node_ids)
+        rows, cols, weights = [], [], []
+        for u, v, w in self.G.edges(data='weight'):
+            rows.append(self.index[u])
+            cols.append(self.index[v])
+            weights.append(w)
+        adjacency = csr_matrix((weights, (rows, cols)), shape=(n, n))
+        self.distances, self.predecessors = shortest_path(adjacency, method='D', directed=False,
+                                                          return_predecessors=True)
+        if file_path:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            np.savez_compressed(file_path, distances=self.distances, predecessors=self.predecessors)
+        return self.distances
+
+    def distance(self, source, target):
+        """Shortest path length between two nodes, inf if they are not connected."""
+        self.compute_all_pairs()
+        return float(self.distances[self.index[source], self.index[target]])
+
     def find_shortest_path(self, source, target):
         """Find and return the shortest path between two nodes."""
-        if nx.has_path(self.G, source, target):
-            shortest_path = nx.shortest_path(self.G, source=source, target=target, weight='weight')
-            return shortest_path
-        else:
+        self.compute_all_pairs()
+        i, j = self.index[source], self.index[target]
+        if not np.isfinite(self.distances[i, j]):
             return None
+        # Walk the predecessors back from the target
+        path = [j]
+        while path[-1] != i:
+            path.append(self.predecessors[i, path[-1]])
+        return [self.node_ids[k] for k in reversed(path)]
 
 # For local usage
 if __name__ == "__main__":
@@ -1,7 +1,16 @@
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy import stats
 import P2_bandit as bd
 import matplotlib.pyplot as plt
 
+def simulate_epsilons(p_dist, r_dist, epsilon_values, n_steps, seed):
+    """Average reward per step of every epsilon in one seeded batch run, used by the tuning workers."""
+    env = bd.BanditEnv(p_dist, r_dist, seed=seed)
+    bandit = EpsilonGreedyBandit(env, epsilon_values, n_steps)
+    totals = bandit.run_batch()
+    return [totals[epsilon] / n_steps for epsilon in epsilon_values]
+
 class EpsilonGreedyBandit:
     def __init__(self, env, epsilon_values, n_steps):
         self.env = env
@@ -9,6 +18,7 @@ class EpsilonGreedyBandit:
         self.n_steps = n_steps
         self.step_rewards = {epsilon: np.zeros(n_steps) for epsilon in epsilon_values}
         self.final_total_rewards = {}
+        self.tuning_results = {}
 
     def run_simulation(self):
         for epsilon in self.epsilon_values:
@@ -20,15 +30,17 @@ class EpsilonGreedyBandit:
             
             print(f"\nRunning simulation with epsilon = {epsilon}")
 
+            # The env's seeded generator also drives the exploration, so seeded runs repeat exactly
+            rng = self.env.np_random
             for step in range(self.n_steps):
-                if np.random.rand() < epsilon:
-                    action = np.random.randint(len(mean_reward))  # Explore
+                if rng.random() < epsilon:
+                    action = int(rng.integers(len(mean_reward)))  # Explore
                     #print(f"Step {step + 1}: Epsilon {epsilon} - Exploring: Chose ({self.env.zone_names[action]})")       
                     action_list.append(action)       
                 else:
                     max_reward_estimate = np.max(mean_reward)
                     best_actions = np.where(mean_reward == max_reward_estimate)[0]
-                    action = np.random.choice(best_actions)  # Exploit
+                    action = int(rng.choice(best_actions))  # Exploit
                     #print(f"Step {step + 1}: Epsilon {epsilon} - Exploiting: Chose ({self.env.zone_names[action]})")
                     action_list.append(action)                    
                 
@@ -48,6 +60,97 @@ class EpsilonGreedyBandit:
             self.final_total_rewards[epsilon] = total_reward
         return action_list
 
+    def run_batch(self, n_runs=1, seed=None, chunk_size=1000):
+        """Vectorized version of run_simulation: n_runs independent runs of every epsilon are simulated
+        at once as NumPy arrays, stepping all of them together with env.step_batch. All random numbers
+        come from the env's generator, reseeded with seed when given.
+        step_rewards and final_total_rewards hold the averages over the runs."""
+        if seed is not None:
+            self.env._seed(seed)
+        rng = self.env.np_random
+        n_arms = len(self.env.p_dist)
+        epsilons = np.repeat(np.array(self.epsilon_values, dtype=float), n_runs)
+        n_bandits = len(epsilons)
+        # Offsets into the flattened (bandit, arm) arrays, flat indexing is cheaper than 2D fancy indexing
+        offsets = np.arange(n_bandits) * n_arms
+
+        mean_reward = np.zeros((n_bandits, n_arms))
+        action_counts = np.zeros(n_bandits * n_arms)
+        flat_mean = mean_reward.ravel()  # View, updates show up in mean_reward
+        total_reward = np.zeros(n_bandits)
+        step_rewards = np.zeros((self.n_steps, len(self.epsilon_values)))
+
+        for chunk_start in range(0, self.n_steps, chunk_size):
+            n = min(chunk_size, self.n_steps - chunk_start)
+            # Random numbers of a whole chunk of steps are drawn in one call each
+            explore = rng.random((n, n_bandits)) < epsilons
+            random_actions = rng.integers(n_arms, size=(n, n_bandits))
+            tie_keys = rng.random((n, n_bandits, n_arms))
+            chunk_totals = np.empty((n, n_bandits))
+
+            for step in range(n):
+                # Exploit picks uniformly among the arms with the highest estimate, as np.random.choice does
+                best = mean_reward.max(axis=1, keepdims=True)
+                greedy = np.argmax(np.where(mean_reward == best, tie_keys[step], -1.0), axis=1)
+                action = np.where(explore[step], random_actions[step], greedy)
+
+                reward = self.env.step_batch(action)
+
+                index = offsets + action
+                counts = action_counts[index] + 1
+                action_counts[index] = counts
+                flat_mean[index] += (reward - flat_mean[index]) / counts
+                total_reward += reward
+                chunk_totals[step] = total_reward
+
+            step_rewards[chunk_start:chunk_start + n] = chunk_totals.reshape(n, -1, n_runs).mean(axis=2)
+
+        for i, epsilon in enumerate(self.epsilon_values):
+            self.step_rewards[epsilon] = step_rewards[:, i]
+            self.final_total_rewards[epsilon] = step_rewards[-1, i]
+        return self.final_total_rewards
+
+    def tune(self, n_seeds=32, workers=None, seed=None, confidence=0.95, min_seeds=4):
+        """Evaluate every epsilon over up to n_seeds independent seeds in a process pool. Results are taken
+        in seed order and the run stops early once the lower confidence bound of the best epsilon lies above
+        the upper bound of every other one, so the outcome does not depend on the number of workers.
+        Returns the best epsilon, the mean reward per step and confidence half-width of every epsilon are
+        kept in self.tuning_results."""
+        workers = workers or 1
+        seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n_seeds)]
+        args = (list(self.env.p_dist), list(self.env.r_dist), self.epsilon_values, self.n_steps)
+        rewards = []  # One row per seed, one column per epsilon
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(simulate_epsilons, *args, s) for s in seeds]
+            for future in futures:
+                rewards.append(future.result())
+                mean, half_width = self.confidence_intervals(np.array(rewards), confidence)
+                best = int(np.argmax(mean))
+                others = np.arange(len(mean)) != best
+                if len(rewards) >= min_seeds and np.all(mean[best] - half_width[best] > (mean + half_width)[others]):
+                    print(f"Epsilon {self.epsilon_values[best]} clearly ahead after {len(rewards)} seeds")
+                    break
+            # Seeds after the stopping point are not needed, those already running are left to finish
+            for future in futures:
+                future.cancel()
+
+        self.tuning_results = {epsilon: (float(m), float(h), len(rewards))
+                               for epsilon, m, h in zip(self.epsilon_values, mean, half_width)}
+        for epsilon, (m, h, n) in self.tuning_results.items():
+            print(f"Epsilon {epsilon}: mean reward {m:.4f} +/- {h:.4f} ({confidence:.0%} CI, {n} seeds)")
+        return self.epsilon_values[best]
+
+    @staticmethod
+    def confidence_intervals(rewards, confidence):
+        # Student t interval of the mean per column, infinitely wide with a single seed
+        n = len(rewards)
+        mean = rewards.mean(axis=0)
+        if n < 2:
+            return mean, np.full(len(mean), np.inf)
+        half_width = stats.t.ppf((1 + confidence) / 2, n - 1) * rewards.std(axis=0, ddof=1) / np.sqrt(n)
+        return mean, half_width
+
     def get_best_epsilon(self):
         # Calculate the average rewards for each epsilon
         final_avg_rewards = {epsilon: self.final_total_rewards[epsilon] / self.n_steps for epsilon in self.epsilon_values}
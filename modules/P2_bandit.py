@@ -16,7 +16,7 @@ class BanditEnv(gym.Env):
         A list of either rewards (if number) or means and standard deviations (if list)
         of the payout that bandit has
     """
-    def __init__(self, p_dist, r_dist):
+    def __init__(self, p_dist, r_dist, seed=None):
         if len(p_dist) != len(r_dist):
             raise ValueError("Probability and Reward distribution must be the same length")
 
@@ -30,11 +30,16 @@ class BanditEnv(gym.Env):
         self.p_dist = p_dist
         self.r_dist = r_dist
 
+        # Arrays of the payout probability and reward mean and standard deviation, used by step_batch
+        self.p_array = np.asarray(p_dist, dtype=float)
+        self.r_mean = np.array([r[0] if isinstance(r, list) else r for r in r_dist], dtype=float)
+        self.r_std = np.array([r[1] if isinstance(r, list) else 0 for r in r_dist], dtype=float)
+
         self.n_bandits = len(p_dist)
         self.action_space = spaces.Discrete(self.n_bandits)
         self.observation_space = spaces.Discrete(1)
 
-        self._seed()
+        self._seed(seed)
 
     def _seed(self, seed=None):
         self.np_random, seed = seeding.np_random(seed)
@@ -46,14 +51,29 @@ class BanditEnv(gym.Env):
         reward = 0
         done = True
 
-        if np.random.uniform() < self.p_dist[action]:
+        # The env's own generator, so seeded runs are reproducible, also across processes
+        if self.np_random.uniform() < self.p_dist[action]:
             if not isinstance(self.r_dist[action], list):
                 reward = self.r_dist[action]
             else:
-                reward = np.random.normal(self.r_dist[action][0], self.r_dist[action][1])
+                reward = self.np_random.normal(self.r_dist[action][0], self.r_dist[action][1])
 
         return 0, reward, done, {}
 
+    def step_batch(self, actions):
+        """Rewards of many independent pulls at once, actions is an array of bandit indices."""
+        actions = np.asarray(actions, dtype=int)
+        if actions.size == 0:
+            return np.zeros(actions.shape)
+        if actions.min() < 0 or actions.max() >= self.n_bandits:
+            raise ValueError(f"Actions must be bandit indices between 0 and {self.n_bandits - 1}")
+
+        rewards = self.r_mean[actions]
+        if self.r_std.any():
+            rewards = self.np_random.normal(rewards, self.r_std[actions])
+        paid = self.np_random.uniform(size=actions.shape) < self.p_array[actions]
+        return np.where(paid, rewards, 0.0)
+
     def reset(self):
         return 0
 
@@ -61,7 +81,7 @@ class BanditEnv(gym.Env):
         pass
 
 class CustomBanditzones(BanditEnv):
-    def __init__(self):
+    def __init__(self, seed=None):
         # Load the zone_id data and store it as an instance variable
         with open("assets/BIM.json", "r") as file:
             self.zone_id = json.load(file)  # Instance variable
@@ -75,7 +95,7 @@ class CustomBanditzones(BanditEnv):
         r_dist = [1] * len(self.zone_id)
 
         # Initialize the parent class (BanditEnv) with p_dist and r_dist
-        BanditEnv.__init__(self, p_dist=p_dist, r_dist=r_dist)
+        BanditEnv.__init__(self, p_dist=p_dist, r_dist=r_dist, seed=seed)
 
         # Print the distributions for verification
         print("p_dist:", p_dist)
@@ -0,0 +1,80 @@
+import json
+import os
+import hashlib
+
+# Rasterized grids, planned segments and other derived planning data are cached here
+CACHE_DIR = "assets/cache"
+
+def params_hash(*params):
+    """Stable short hash of JSON-serializable parameters, used in cache keys."""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+class SegmentCache:
+    def __init__(self, geometry_hash, file_name="segments.json"):
+        """On-disk cache of planned door-to-door segments for one obstacle geometry."""
+        self.file_path = os.path.join(CACHE_DIR, file_name)
+        self.geometry_hash = geometry_hash
+        self.segments = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return
+        with open(self.file_path, "r") as file:
+            data = json.load(file)
+
+        # Segments planned around different walls are no longer valid
+        if data.get("geometry") != self.geometry_hash:
+            print("Wall geometry changed, segment cache invalidated")
+            return
+        self.segments = data.get("segments", {})
+
+    def save(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(self.file_path, "w") as file:
+            json.dump({"geometry": self.geometry_hash, "segments": self.segments}, file)
+
+    def key(self, start_node, goal_node, params, start, goal):
+        # Door coordinates are part of the key, a moved door must not return a segment ending at its old place
+        return f"{start_node}-{goal_node}|{params_hash(list(start), list(goal))}|{self.geometry_hash}|{params}"
+
+    def get(self, start_node, goal_node, params, start, goal):
+        """Return a cached path between two door nodes, reversing the opposite direction if needed."""
+        path = self.segments.get(self.key(start_node, goal_node, params, start, goal))
+        if path is not None:
+            return path
+        path = self.segments.get(self.key(goal_node, start_node, params, goal, start))
+        if path is not None:
+            return path[::-1]
+        return None
+
+    def put(self, start_node, goal_node, params, start, goal, path):
+        self.segments[self.key(start_node, goal_node, params, start, goal)] = path
+
+class EpsilonCache:
+    def __init__(self, file_name="epsilon.json"):
+        """On-disk record of epsilon tuning outcomes, keyed by the zone risk profile and the search parameters."""
+        self.file_path = os.path.join(CACHE_DIR, file_name)
+        self.results = {}
+        if os.path.exists(self.file_path):
+            with open(self.file_path, "r") as file:
+                self.results = json.load(file)
+
+    def save(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(self.file_path, "w") as file:
+            json.dump(self.results, file)
+
+    def key(self, p_dist, r_dist, *params):
+        # The risk_factor list (p_dist) is all the epsilon search depends on from BIM.json
+        return params_hash(list(p_dist), list(r_dist), *params)
+
+    def get(self, key):
+        """Return the cached best epsilon, None if this profile and these parameters were not tuned yet."""
+        result = self.results.get(key)
+        return None if result is None else result["best_epsilon"]
+
+    def put(self, key, best_epsilon):
+        self.results[key] = {"best_epsilon": best_epsilon}
+        self.save()
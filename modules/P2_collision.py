@@ -0,0 +1,311 @@
+import numpy as np
+import math
+import os
+import json
+import hashlib
+from collections import OrderedDict
+import shapely
+from shapely.geometry import Polygon, LineString, Point
+from shapely.strtree import STRtree
+from scipy.ndimage import distance_transform_edt
+from P2_cache import CACHE_DIR
+
+# Radius of the circle around the Unitree Go2 footprint (about 0.37 m), in plan units assuming 5 cm per unit
+GO2_FOOTPRINT_RADIUS = 7.5
+
+def to_polygon(obstacle):
+    """Obstacles are point lists as in BIM.plan, or shapely geometries after preprocessing."""
+    polygon = obstacle if isinstance(obstacle, shapely.Geometry) else Polygon(obstacle)
+    if not polygon.is_valid:
+        polygon = shapely.make_valid(polygon)
+    return polygon
+
+def inflate_obstacles(polygon_points, radius):
+    """Union the obstacles and grow them by the robot radius (configuration space), so the
+    planners can treat the robot as a point. Enclosed rooms are kept as holes."""
+    union = shapely.unary_union([to_polygon(points) for points in polygon_points])
+    inflated = union.buffer(radius, quad_segs=4)
+    return [part for part in shapely.get_parts(inflated) if isinstance(part, Polygon)]
+
+def vertex_count(polygon_points):
+    """Total number of polygon vertices, the edge tests a brute force probe would need."""
+    count = 0
+    for points in polygon_points:
+        polygon = to_polygon(points)
+        if isinstance(polygon, shapely.Geometry):
+            count += sum(len(ring.coords) - 1 for part in shapely.get_parts(polygon) if isinstance(part, Polygon)
+                         for ring in [part.exterior] + list(part.interiors))
+    return count
+
+def split_polygon(polygon, max_vertices=16, overlap=1e-3):
+    """Split a polygon along the longer side of its bounding box until every piece has at most
+    max_vertices vertices. The halves overlap slightly, so a segment running along a cut line
+    still lies inside a piece instead of only touching two of them."""
+    if len(polygon.exterior.coords) - 1 <= max_vertices and not polygon.interiors:
+        return [polygon]
+    x_min, y_min, x_max, y_max = polygon.bounds
+    if x_max - x_min >= y_max - y_min:
+        middle = (x_min + x_max) / 2
+        halves = [shapely.box(x_min, y_min, middle + overlap, y_max), shapely.box(middle - overlap, y_min, x_max, y_max)]
+    else:
+        middle = (y_min + y_max) / 2
+        halves = [shapely.box(x_min, y_min, x_max, middle + overlap), shapely.box(x_min, middle - overlap, x_max, y_max)]
+    pieces = []
+    for half in halves:
+        for part in shapely.get_parts(polygon.intersection(half)):
+            if isinstance(part, Polygon) and not part.is_empty:
+                pieces.extend(split_polygon(part, max_vertices, overlap))
+    return pieces
+
+def simplify_obstacles(polygon_points, tolerance=0.5):
+    """Merge overlapping obstacles and simplify them within the tolerance. A polygon that lost vertices
+    is grown by the tolerance again, so no wall area is lost; the others are kept as they are."""
+    union = shapely.unary_union([to_polygon(points) for points in polygon_points])
+    simplified = []
+    for part in shapely.get_parts(union):
+        if not isinstance(part, Polygon):
+            continue
+        reduced = part.simplify(tolerance, preserve_topology=True)
+        if vertex_count([reduced]) < vertex_count([part]):
+            # Drop collinear vertices the buffer may add, its mitre corners stay
+            part = reduced.buffer(tolerance, join_style="mitre").simplify(0)
+        simplified.extend(p for p in shapely.get_parts(part) if isinstance(p, Polygon))
+    return simplified
+
+def preprocess_obstacles(polygon_points, tolerance=0.5, max_vertices=16):
+    """Merge and simplify the obstacles, then split large polygons into pieces of bounded size, so the
+    STRtree returns smaller candidates per probe. The cut lines add vertices in total, but a probe
+    only tests the edges of the few pieces it overlaps."""
+    pieces = []
+    for part in simplify_obstacles(polygon_points, tolerance):
+        pieces.extend(split_polygon(part, max_vertices))
+    return pieces
+
+class CollisionChecker:
+    def __init__(self, polygon_points):
+        """Prepare the obstacle polygons once and index them in an STRtree."""
+        self.polygon_points = polygon_points
+        self.geoms = [to_polygon(points) for points in polygon_points]
+
+        self.geoms = np.array(self.geoms, dtype=object)
+        shapely.prepare(self.geoms)  # Prepared geometries speed up repeated predicates
+        self.tree = STRtree(self.geoms)
+
+    def is_point_free(self, point):
+        """Check whether a point lies outside all obstacles."""
+        return not self.hits(Point(point))
+
+    def is_collision_free(self, p1, p2):
+        """Check whether the straight segment p1-p2 crosses any obstacle."""
+        if p1[0] == p2[0] and p1[1] == p2[1]:
+            return self.is_point_free(p1)
+        return not self.hits(LineString([p1, p2]))
+
+    def hits(self, geometry):
+        # Bounding box candidates from the tree, then the exact test on prepared polygons
+        candidates = self.tree.query(geometry)
+        if len(candidates) == 0:
+            return False
+        polygons = self.geoms[candidates]
+        intersecting = polygons[shapely.intersects(polygons, geometry)]
+        if len(intersecting) == 0:
+            return False
+        # Grazing a wall along its boundary is not a collision. Walls meeting edge to edge are tested as
+        # one, a segment along their shared edge only touches each of them but runs through solid wall
+        walls = intersecting[0] if len(intersecting) == 1 else shapely.union_all(intersecting)
+        return not walls.touches(geometry)
+
+class OccupancyGrid:
+    def __init__(self, polygon_points, boundary, resolution=1.0, use_cache=True):
+        """Rasterize the obstacle polygons once into a boolean grid, cells are resolution units wide."""
+        self.boundary = boundary  # boundary = (x_min, x_max, y_min, y_max)
+        self.resolution = resolution
+        self.polygon_points = polygon_points
+        x_min, x_max, y_min, y_max = boundary
+        self.shape = (int(math.ceil((y_max - y_min) / resolution)) + 1, int(math.ceil((x_max - x_min) / resolution)) + 1)
+
+        cache_file = None
+        if use_cache:
+            key = geometry_hash(polygon_points, boundary, resolution)
+            cache_file = os.path.join(CACHE_DIR, f"occupancy_{key}.npz")
+            if os.path.exists(cache_file):
+                self.grid = np.load(cache_file)["grid"]
+                return
+
+        self.grid = self.rasterize(polygon_points)
+        if cache_file:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            np.savez_compressed(cache_file, grid=self.grid)
+
+    def rasterize(self, polygon_points):
+        grid = np.zeros(self.shape, dtype=bool)
+        x_min, _, y_min, _ = self.boundary
+        for points in polygon_points:
+            polygon = to_polygon(points)
+            px_min, py_min, px_max, py_max = polygon.bounds
+            c0, r0 = self.to_cell(px_min, py_min)
+            c1, r1 = self.to_cell(px_max, py_max)
+            c0, r0 = max(c0, 0), max(r0, 0)
+            c1, r1 = min(c1, self.shape[1] - 1), min(r1, self.shape[0] - 1)
+            if c0 > c1 or r0 > r1:
+                continue
+
+            # Cell centres inside the polygon
+            cols, rows = np.meshgrid(np.arange(c0, c1 + 1), np.arange(r0, r1 + 1))
+            xs = x_min + cols * self.resolution
+            ys = y_min + rows * self.resolution
+            inside = shapely.contains_xy(polygon, xs, ys)
+            grid[rows[inside], cols[inside]] = True
+
+            # Walls thinner than a cell have no centre inside them, so trace the edges as well
+            for ring in shapely.get_parts(shapely.boundary(polygon)):
+                coords = np.asarray(ring.coords)
+                for (x1, y1), (x2, y2) in zip(coords[:-1], coords[1:]):
+                    n = max(int(math.hypot(x2 - x1, y2 - y1) / (self.resolution / 2)), 1)
+                    u = np.linspace(0, 1, n + 1)
+                    self.mark(grid, x1 + (x2 - x1) * u, y1 + (y2 - y1) * u)
+        return grid
+
+    def mark(self, grid, xs, ys):
+        cols, rows = self.to_cell(xs, ys)
+        valid = (cols >= 0) & (cols < self.shape[1]) & (rows >= 0) & (rows < self.shape[0])
+        grid[rows[valid], cols[valid]] = True
+
+    def to_cell(self, x, y):
+        x_min, _, y_min, _ = self.boundary
+        col = np.rint((np.asarray(x) - x_min) / self.resolution).astype(int)
+        row = np.rint((np.asarray(y) - y_min) / self.resolution).astype(int)
+        return col, row
+
+    def point_cell(self, point):
+        """(col, row) of the cell a single point falls in."""
+        col, row = self.to_cell(point[0], point[1])
+        return int(col), int(row)
+
+    def cell_point(self, cell):
+        x_min, _, y_min, _ = self.boundary
+        return [x_min + cell[0] * self.resolution, y_min + cell[1] * self.resolution]
+
+    def nearest_free(self, cell, max_radius=5):
+        """The cell itself when free, else the closest free cell within max_radius rings, None if there is none.
+        Points close to a wall, like path endpoints, can fall in an occupied cell."""
+        rows, cols = self.grid.shape
+        for r in range(max_radius + 1):
+            ring = [(cell[0] + dx, cell[1] + dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1)
+                    if max(abs(dx), abs(dy)) == r and 0 <= cell[0] + dx < cols and 0 <= cell[1] + dy < rows
+                    and not self.grid[cell[1] + dy, cell[0] + dx]]
+            if ring:
+                return min(ring, key=lambda c: math.hypot(c[0] - cell[0], c[1] - cell[1]))
+        return None
+
+    def occupied(self, xs, ys):
+        """Vectorized lookup, cells outside the grid count as free."""
+        cols, rows = self.to_cell(xs, ys)
+        valid = (cols >= 0) & (cols < self.shape[1]) & (rows >= 0) & (rows < self.shape[0])
+        result = np.zeros(np.shape(cols), dtype=bool)
+        result[valid] = self.grid[rows[valid], cols[valid]]
+        return result
+
+    def is_point_free(self, point):
+        return not bool(self.occupied(point[0], point[1]))
+
+    def is_collision_free(self, p1, p2):
+        """Look up every cell the segment p1-p2 passes through, sampled at half a cell."""
+        n = max(int(math.hypot(p2[0] - p1[0], p2[1] - p1[1]) / (self.resolution / 2)), 1)
+        u = np.linspace(0, 1, n + 1)
+        xs = p1[0] + (p2[0] - p1[0]) * u
+        ys = p1[1] + (p2[1] - p1[1]) * u
+        return not self.occupied(xs, ys).any()
+
+class ClearanceMap:
+    def __init__(self, polygon_points, boundary, resolution=1.0, use_cache=True):
+        """Distance from every cell to the nearest wall, so clearance costs are a single array lookup."""
+        self.occupancy = OccupancyGrid(polygon_points, boundary, resolution, use_cache)
+        self.resolution = resolution
+
+        cache_file = None
+        if use_cache:
+            key = geometry_hash(polygon_points, boundary, resolution)
+            cache_file = os.path.join(CACHE_DIR, f"clearance_{key}.npz")
+            if os.path.exists(cache_file):
+                self.distance = np.load(cache_file)["distance"]
+                return
+
+        # Euclidean distance transform of the free cells, converted to plan units
+        self.distance = (distance_transform_edt(~self.occupancy.grid) * resolution).astype(np.float32)
+        if cache_file:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            np.savez_compressed(cache_file, distance=self.distance)
+
+    def clearance(self, xs, ys):
+        """Distance to the nearest wall at the given points (vectorized), 0 inside walls."""
+        cols, rows = self.occupancy.to_cell(xs, ys)
+        rows = np.clip(rows, 0, self.distance.shape[0] - 1)
+        cols = np.clip(cols, 0, self.distance.shape[1] - 1)
+        return self.distance[rows, cols]
+
+    def path_clearance(self, path, step=None):
+        """Smallest clearance along a path, sampled every cell."""
+        step = step or self.resolution
+        clearances = []
+        for p1, p2 in zip(path[:-1], path[1:]):
+            n = max(int(math.hypot(p2[0] - p1[0], p2[1] - p1[1]) / step), 1)
+            u = np.linspace(0, 1, n + 1)
+            clearances.append(self.clearance(p1[0] + (p2[0] - p1[0]) * u, p1[1] + (p2[1] - p1[1]) * u).min())
+        return float(min(clearances)) if clearances else float(self.clearance(path[0][0], path[0][1]))
+
+def geometry_hash(polygon_points, *params):
+    """Stable hash of the wall geometry (and any extra parameters) used as cache key."""
+    geometry = [points.wkb_hex if isinstance(points, shapely.Geometry)
+                else [[round(float(c), 6) for c in point] for point in points] for points in polygon_points]
+    payload = json.dumps(geometry + [list(params)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+def make_collision_checker(polygon_points, backend="geometry", boundary=(0, 3000, 0, 2000), resolution=1.0,
+                           robot_radius=0.0, simplify_tolerance=0.0):
+    """Create the collision backend selected by name: 'geometry' or 'grid'.
+    With a robot_radius the obstacles are inflated first, so the robot can be treated as a point.
+    With a simplify_tolerance they are merged, simplified and split by preprocess_obstacles."""
+    if robot_radius > 0:
+        polygon_points = inflate_obstacles(polygon_points, robot_radius)
+    if simplify_tolerance > 0:
+        polygon_points = preprocess_obstacles(polygon_points, simplify_tolerance)
+    if backend == "geometry":
+        return CollisionChecker(polygon_points)
+    if backend == "grid":
+        return OccupancyGrid(polygon_points, boundary, resolution)
+    raise ValueError(f"Unknown collision backend: {backend}")
+
+class CollisionCache:
+    def __init__(self, max_size=200000):
+        """Bounded LRU cache of segment collision outcomes, shareable between planners of one plan."""
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(p1, p2):
+        # Segments are undirected, so both directions share one entry
+        a = (float(p1[0]), float(p1[1]))
+        b = (float(p2[0]), float(p2[1]))
+        return (a, b) if a <= b else (b, a)
+
+    def lookup(self, p1, p2, check):
+        """Return the cached outcome for p1-p2, calling check(p1, p2) on a miss."""
+        key = self.key(p1, p2)
+        result = self.entries.get(key)
+        if result is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return result
+        self.misses += 1
+        result = check(p1, p2)
+        self.entries[key] = result
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return result
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
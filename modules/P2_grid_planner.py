@@ -0,0 +1,173 @@
+import heapq
+import math
+import P1_BIM as BIM
+import P2_collision as CC
+from P2_Lowerlevel_network import RRTStar
+
+class GridPlanner(RRTStar):
+    def __init__(self, start, goal, obstacle, boundary, grid_resolution=5.0, **kwargs):
+        """Deterministic A* with Jump Point Search on a rasterized free-space map of the floor.
+        Identical inputs always give the same path; the sampling parameters of RRTStar are ignored."""
+        super().__init__(start, goal, obstacle, boundary, **kwargs)
+        self.grid_resolution = grid_resolution
+        self.occupancy = None
+        self.path = None
+
+    def load_grid(self):
+        # Reuse the collision backend when it already is a grid of the right resolution
+        if isinstance(self.collision, CC.OccupancyGrid) and self.collision.resolution == self.grid_resolution:
+            self.occupancy = self.collision
+        else:
+            # Obstacles of the collision backend may be inflated by the robot radius
+            polygon_points = getattr(self.collision, "polygon_points", None)
+            if polygon_points is None:
+                polygon_points = BIM.plan if not self.obstacle else [polygon.get_xy() for polygon in self.obstacle]
+            self.occupancy = CC.OccupancyGrid(polygon_points, self.boundary, self.grid_resolution)
+        self.rows, self.cols = self.occupancy.shape
+
+    def walkable(self, x, y):
+        return 0 <= x < self.cols and 0 <= y < self.rows and not self.occupancy.grid[y, x]
+
+    def neighbours(self, cell, parent):
+        """Pruned neighbours of JPS, diagonal moves only when both adjacent cells are free."""
+        x, y = cell
+        if parent is None:
+            result = []
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                if self.walkable(x + dx, y + dy):
+                    result.append((dx, dy))
+            for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                if self.walkable(x + dx, y) and self.walkable(x, y + dy) and self.walkable(x + dx, y + dy):
+                    result.append((dx, dy))
+            return result
+
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        result = []
+        if dx and dy:
+            walk_x, walk_y = self.walkable(x + dx, y), self.walkable(x, y + dy)
+            if walk_y:
+                result.append((0, dy))
+            if walk_x:
+                result.append((dx, 0))
+            if walk_x and walk_y:
+                result.append((dx, dy))
+        elif dx:
+            walk_up, walk_down = self.walkable(x, y + 1), self.walkable(x, y - 1)
+            if self.walkable(x + dx, y):
+                result.append((dx, 0))
+                if walk_up:
+                    result.append((dx, 1))
+                if walk_down:
+                    result.append((dx, -1))
+            if walk_up:
+                result.append((0, 1))
+            if walk_down:
+                result.append((0, -1))
+        else:
+            walk_right, walk_left = self.walkable(x + 1, y), self.walkable(x - 1, y)
+            if self.walkable(x, y + dy):
+                result.append((0, dy))
+                if walk_right:
+                    result.append((1, dy))
+                if walk_left:
+                    result.append((-1, dy))
+            if walk_right:
+                result.append((1, 0))
+            if walk_left:
+                result.append((-1, 0))
+        return result
+
+    def jump(self, x, y, dx, dy):
+        """Move from (x, y) in direction (dx, dy) until a jump point, the goal or a wall is found."""
+        while True:
+            if not self.walkable(x, y):
+                return None
+            if (x, y) == self.goal_cell:
+                return (x, y)
+            if dx and dy:
+                # A diagonal move stops where a straight jump finds something
+                if self.jump(x + dx, y, dx, 0) or self.jump(x, y + dy, 0, dy):
+                    return (x, y)
+                if not (self.walkable(x + dx, y) and self.walkable(x, y + dy)):
+                    return None
+            elif dx:
+                if ((self.walkable(x, y - 1) and not self.walkable(x - dx, y - 1)) or
+                        (self.walkable(x, y + 1) and not self.walkable(x - dx, y + 1))):
+                    return (x, y)
+            else:
+                if ((self.walkable(x - 1, y) and not self.walkable(x - 1, y - dy)) or
+                        (self.walkable(x + 1, y) and not self.walkable(x + 1, y - dy))):
+                    return (x, y)
+            x, y = x + dx, y + dy
+
+    def jps(self):
+        self.load_grid()
+        start_cell = self.occupancy.nearest_free(self.occupancy.point_cell(self.start))
+        self.goal_cell = self.occupancy.nearest_free(self.occupancy.point_cell(self.goal))
+        if start_cell is None or self.goal_cell is None:
+            return None
+
+        def heuristic(cell):
+            # Octile distance, exact on an 8-connected grid without obstacles
+            ddx, ddy = abs(cell[0] - self.goal_cell[0]), abs(cell[1] - self.goal_cell[1])
+            return max(ddx, ddy) + (math.sqrt(2) - 1) * min(ddx, ddy)
+
+        parents = {start_cell: None}
+        costs = {start_cell: 0.0}
+        open_list = [(heuristic(start_cell), 0, start_cell)]
+        counter = 1
+        closed = set()
+        while open_list:
+            _, _, cell = heapq.heappop(open_list)
+            if cell in closed:
+                continue
+            closed.add(cell)
+            self.iterations += 1
+            if cell == self.goal_cell:
+                break
+            for dx, dy in self.neighbours(cell, parents[cell]):
+                jump_point = self.jump(cell[0] + dx, cell[1] + dy, dx, dy)
+                if jump_point is None or jump_point in closed:
+                    continue
+                cost = costs[cell] + math.hypot(jump_point[0] - cell[0], jump_point[1] - cell[1])
+                if cost < costs.get(jump_point, float('inf')):
+                    costs[jump_point] = cost
+                    parents[jump_point] = cell
+                    heapq.heappush(open_list, (cost + heuristic(jump_point), counter, jump_point))
+                    counter += 1
+        self.tree_cells = len(costs)
+
+        if self.goal_cell not in parents:
+            return None
+        cells = []
+        cell = self.goal_cell
+        while cell is not None:
+            cells.append(cell)
+            cell = parents[cell]
+        cells.reverse()
+
+        # Jump points as world coordinates, with the exact endpoints instead of their cell centres
+        self.path = [self.start] + [self.occupancy.cell_point(cell) for cell in cells[1:-1]] + [self.goal]
+        return self.path
+
+    def extract_path(self):
+        if self.path is None:
+            return [self.goal]
+        return self.path
+
+    def stats(self):
+        stats = super().stats()
+        stats["tree_size"] = getattr(self, "tree_cells", 0)
+        return stats
+
+    def plan(self, smooth=True):
+        self.jps()
+        path = self.extract_path()
+        if smooth:
+            path = self.smooth_path(path)
+        return path
+
+    def rrt_star_with_smoothing(self, smooth=True):
+        # Same call as RRTStar, so the planners are interchangeable
+        return self.plan(smooth=smooth)
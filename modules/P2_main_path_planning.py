@@ -1,29 +1,106 @@
 import json
+import csv
+import os
+import time
+import argparse
+import sys
+from datetime import datetime
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 import P2_bandit as bd
 import P2_agent as agent
 import P2_Lowerlevel_network as LN
+import P2_planners as PL
 import P2_Upperlevel_network as UN
+import P2_collision as CC
+import P2_cache as cache
+import P2_roadmap as RM
+import P2_visibility_graph as VG
+import P2_tour as TO
 import P1_BIM as BIM
 
 class NetworkPlanner:
-    def __init__(self, json_file_path):
+    def __init__(self, json_file_path, collision_backend="geometry", grid_resolution=1.0, workers=None, seed=None,
+                 use_segment_cache=True, engine="rrt_star", planner_params=None, plot=True,
+                 smoothing="greedy", robot_radius=0.0, simplify_tolerance=0.0,
+                 reuse_trees=False, schedule_mode="bandit", battery_budget=None,
+                 tuning_seeds=None, use_epsilon_cache=True):
         self.json_file_path = json_file_path
+        self.boundary = (0, 3000, 0, 2000)
+        self.collision_backend = collision_backend  # 'geometry' (STRtree) or 'grid' (rasterized occupancy grid)
+        self.grid_resolution = grid_resolution
+        # Obstacles are inflated by this radius, e.g. CC.GO2_FOOTPRINT_RADIUS, 0 plans for a point robot
+        self.robot_radius = robot_radius
+        # Obstacles are merged, simplified within this tolerance and split into small pieces, 0 keeps BIM.plan as is
+        self.simplify_tolerance = simplify_tolerance
+        self.clearance = None
+        self.checker = None
+        self.collision_cache = CC.CollisionCache()  # Segment outcomes shared by every planner of this plan
+        self.workers = workers  # Number of processes for leg planning, None or 1 plans sequentially
+        self.seed = seed  # Base seed, every leg gets its own seed derived from it
+        self.seed_sequence = None
+        # Keep the RRT* tree of every leg start and extend it for later legs sharing that door node,
+        # only for sequential rrt_star planning since trees cannot be shared between processes
+        self.reuse_trees = reuse_trees
+        self.trees = {}
+        # RRTStar keyword arguments, e.g. anytime=True, time_budget=2.0, sample_margin=200 for anytime planning
+        self.planner_params = {"max_iter": 10000, "goal_radius": 20, "step_size": 10, "search_radius": 10}
+        self.planner_params.update(planner_params or {})
+        self.use_segment_cache = use_segment_cache  # Reuse door-to-door segments planned in earlier runs
+        self.segment_cache = None
+        # Lower-level planner: 'rrt_star', 'rrt_connect', 'jps' (grid A* with jump point search),
+        # 'prm' (precomputed roadmap) or 'visibility' (visibility graph)
+        self.engine = engine
+        self.roadmap = None
+        self.locator = None
+        self.analyzer = None
+        self.visibility_graph = None
+        self.plot = plot  # Show every path section in a (blocking) window
+        self.smoothing = smoothing  # Shortcutting of the stitched path: 'greedy' or 'bisect' (bounded work)
+        self.leg_report = []  # Planning statistics per leg
+        # Zone order: 'bandit' (epsilon-greedy simulation) or 'tour' (priority and travel cost aware)
+        self.schedule_mode = schedule_mode
+        self.battery_budget = battery_budget  # Travel cost one charge allows in tour mode, None visits every zone
+        # Evaluate every epsilon over up to this many seeds in a process pool, None uses a single run
+        self.tuning_seeds = tuning_seeds
+        self.use_epsilon_cache = use_epsilon_cache  # Skip the epsilon search when the zone risk profile is unchanged
         self.best_epsilon = None
         self.schedule = []
         self.coordinates = {}
         self.smoothed_paths = []  # Store all smoothed paths
 
     def define_epsilon(self):
-        env = bd.CustomBanditzones()
+        env = bd.CustomBanditzones(seed=self.seed)
         epsilon_values = [0.5, 0.4, 0.3, 0.2, 0.1, 0.05]
 
-        optimizer = agent.EpsilonGreedyBandit(env, epsilon_values, n_steps=100000)
-        optimizer.run_simulation()
-        self.best_epsilon = optimizer.get_best_epsilon()
+        n_steps = 100000
+        confidence, min_seeds = 0.95, 4  # Stopping rule of the multi-seed tuning
+
+        epsilon_cache = cache.EpsilonCache() if self.use_epsilon_cache else None
+        if epsilon_cache:
+            key = epsilon_cache.key(env.p_dist, env.r_dist, epsilon_values, n_steps, self.tuning_seeds, self.seed,
+                                    confidence, min_seeds)
+            self.best_epsilon = epsilon_cache.get(key)
+            if self.best_epsilon is not None:
+                print(f"Zone risk profile unchanged, using cached epsilon {self.best_epsilon}")
+                return self.best_epsilon
+
+        optimizer = agent.EpsilonGreedyBandit(env, epsilon_values, n_steps=n_steps)
+        if self.tuning_seeds:
+            # Stable choice from many seeds with confidence intervals, stops early once one epsilon is clearly ahead
+            self.best_epsilon = optimizer.tune(self.tuning_seeds, workers=self.workers or os.cpu_count(), seed=self.seed,
+                                              confidence=confidence, min_seeds=min_seeds)
+        else:
+            # All epsilons are simulated together in NumPy, much faster than run_simulation's loop per epsilon
+            optimizer.run_batch()
+            self.best_epsilon = optimizer.get_best_epsilon()
+
+        if epsilon_cache:
+            epsilon_cache.put(key, self.best_epsilon)
         return self.best_epsilon
 
     def calc_schedule(self, epsilon):
-        env = bd.CustomBanditzones()
+        env = bd.CustomBanditzones(seed=self.seed)
         epsilon_values = [epsilon]
         calc_schedule_optimizer = agent.EpsilonGreedyBandit(env, epsilon_values, n_steps=5)
         schedule = calc_schedule_optimizer.run_simulation()
@@ -40,98 +117,361 @@ class NetworkPlanner:
         self.schedule = remove_exact_duplicates(schedule)
         return self.schedule
 
+    def calc_tour(self):
+        """Closed tour over the zones, weighing risk_factor and amount_of_hazards against travel cost."""
+        locations = [zone['location'] for zone in self.coordinates.values()]
+        costs = TO.travel_cost_matrix(locations, self.get_locator(), self.get_analyzer())
+        optimizer = TO.TourOptimizer(costs, TO.zone_priorities(self.coordinates), budget=self.battery_budget)
+        self.schedule = optimizer.optimize()
+        print(f"Tour over {len(self.schedule) - 1} zones, travel cost {optimizer.tour_cost(self.schedule):.0f}")
+        return self.schedule
+
     def load_coordinates(self):
         with open(self.json_file_path, 'r') as file:
             self.coordinates = json.load(file)
         return self.coordinates
 
     def run_upper_level_network(self, schedule):
-        analyzer = UN.GraphAnalyzer(BIM.nodes, BIM.connections_list)
-        nodes = BIM.nodes
-        locator = UN.NodeLocator(nodes)
+        analyzer = self.get_analyzer()
+        locator = self.get_locator()
 
         source_zone = schedule[0]
         target_zone = schedule[1]
         source_location = tuple(self.coordinates.values())[source_zone]['location']
         target_location = tuple(self.coordinates.values())[target_zone]['location']
 
-        closest_to_source = locator.find_closest_node(source_location)
-        closest_to_target = locator.find_closest_node(target_location)
+        # Prefer the nearest door that is not behind a wall, the nearest door overall otherwise
+        nearest = locator.find_k_nearest([source_location, target_location], k=1, reachable=True)
+        closest_to_source = nearest[0][0] if nearest[0] else locator.find_closest_node(source_location)
+        closest_to_target = nearest[1][0] if nearest[1] else locator.find_closest_node(target_location)
 
         shortest_path = analyzer.find_shortest_path(closest_to_source[0], closest_to_target[0])
         return shortest_path, source_location, target_location
 
-    def run_lower_level_network(self, shortest_path, source_location, target_location):
-        boundary = (0, 3000, 0, 2000)
-        obstacle = BIM.plan
-        all_paths = []
-
-        rrt_star_planner = LN.RRTStar(source_location, BIM.nodes[shortest_path[0]], [], boundary)
-        rrt_star_planner.set_obstacles(obstacle)
-        path_to_closest_node = rrt_star_planner.rrt_star_with_smoothing(smooth=False)
-        all_paths.extend(path_to_closest_node)
-
-        for i in range(len(shortest_path) - 1):
-            start = BIM.nodes[shortest_path[i]]
-            goal = BIM.nodes[shortest_path[i + 1]]
-            rrt_star_planner = LN.RRTStar(start, goal, [], boundary)
-            rrt_star_planner.set_obstacles(obstacle)
-            path_segment = rrt_star_planner.rrt_star_with_smoothing(smooth=False)
-            if len(all_paths) > 0:
-                all_paths.extend(path_segment[1:])
-            else:
-                all_paths.extend(path_segment)
-
-        rrt_star_planner = LN.RRTStar(BIM.nodes[shortest_path[-1]], target_location, [], boundary)
-        rrt_star_planner.set_obstacles(obstacle)
-        path_to_target_node = rrt_star_planner.rrt_star_with_smoothing(smooth=False)
-        all_paths.extend(path_to_target_node)
-
-        rrt_star_planner = LN.RRTStar(all_paths[0], all_paths[-1], [], boundary)
-        rrt_star_planner.set_obstacles(obstacle)
-        smoothed_path = rrt_star_planner.smooth_path(all_paths)
+    def get_analyzer(self):
+        # One door graph per planner, its all-pairs matrices answer every schedule pair
+        if self.analyzer is None:
+            self.analyzer = UN.GraphAnalyzer(BIM.nodes, BIM.connections_list)
+        return self.analyzer
+
+    def get_locator(self):
+        if self.locator is None:
+            self.locator = UN.NodeLocator(BIM.nodes, collision_checker=self.collision_checker())
+        return self.locator
+
+    def section_legs(self, shortest_path, source_location, target_location):
+        """Split a path section into independent legs: zone centre -> door nodes -> zone centre.
+        Each leg is (start, goal, door_nodes), door_nodes is None for legs touching a zone centre."""
+        waypoints = [source_location] + [BIM.nodes[node] for node in shortest_path] + [target_location]
+        node_ids = [None] + list(shortest_path) + [None]
+        legs = []
+        for i in range(len(waypoints) - 1):
+            door_nodes = None
+            if node_ids[i] is not None and node_ids[i + 1] is not None:
+                door_nodes = (node_ids[i], node_ids[i + 1])
+            legs.append((waypoints[i], waypoints[i + 1], door_nodes))
+        return legs
+
+    def leg_seeds(self, n_legs):
+        """Derive one independent, reproducible seed per leg from the planner seed."""
+        if self.seed_sequence is None:
+            self.seed_sequence = np.random.SeedSequence(self.seed)
+            if self.seed is None:
+                print("Leg seeds derived from entropy (pass as seed to reproduce):", self.seed_sequence.entropy)
+        return [int(child.generate_state(1)[0]) for child in self.seed_sequence.spawn(n_legs)]
+
+    def plan_legs(self, legs):
+        """Plan every leg, door-to-door legs come from the segment cache when possible."""
+        seeds = self.leg_seeds(len(legs))
+        leg_paths = [None] * len(legs)
+
+        params = self.segment_params()
+        if self.use_segment_cache:
+            for i, (start, goal, door_nodes) in enumerate(legs):
+                if door_nodes is not None:
+                    leg_paths[i] = self.get_segment_cache().get(door_nodes[0], door_nodes[1], params, start, goal)
+
+        todo = [i for i in range(len(legs)) if leg_paths[i] is None]
+        print(f"Planning {len(todo)} of {len(legs)} legs ({len(legs) - len(todo)} from segment cache)")
+        planned = self.run_engine([legs[i][:2] for i in todo], [seeds[i] for i in todo])
+
+        leg_stats = [{"engine": "cache", "iterations": 0, "tree_size": 0, "collision_checks": 0, "wall_time": 0.0}
+                     for _ in legs]
+        for i, (path, stats) in zip(todo, planned):
+            leg_paths[i] = path
+            leg_stats[i] = stats
+            start, goal, door_nodes = legs[i]
+            # Only segments that actually reached the goal from the start are worth keeping
+            if self.use_segment_cache and door_nodes is not None and len(path) > 1 and path[0] == start:
+                self.get_segment_cache().put(door_nodes[0], door_nodes[1], params, start, goal, path)
+
+        if self.use_segment_cache and todo:
+            self.get_segment_cache().save()
+
+        for (start, goal, door_nodes), path, stats in zip(legs, leg_paths, leg_stats):
+            self.leg_report.append(dict(stats, start=start, goal=goal, door_nodes=door_nodes,
+                                        path_length=LN.path_length(path), reached=len(path) > 1,
+                                        min_clearance=self.clearance_map().path_clearance(path)))
+        return leg_paths
+
+    def run_engine(self, legs, seeds):
+        """Plan every (start, goal) leg with the selected lower-level engine, returns (path, stats) pairs."""
+        if self.engine in PL.PLANNERS:
+            return self.run_rrt_star(legs, seeds)
+        if self.engine == "prm":
+            return self.run_graph(self.get_roadmap(), legs, seeds)
+        if self.engine == "visibility":
+            return self.run_graph(self.get_visibility_graph(), legs, seeds)
+        raise ValueError(f"Unknown planning engine: {self.engine}")
+
+    def run_graph(self, roadmap, legs, seeds):
+        """Answer the legs from a precomputed graph (roadmap or visibility graph)."""
+        results = []
+        for start, goal in legs:
+            checks = roadmap.collision_checks
+            start_time = time.perf_counter()
+            path = roadmap.query(start, goal)
+            stats = {"engine": self.engine, "iterations": 0, "tree_size": len(roadmap.points),
+                     "collision_checks": roadmap.collision_checks - checks, "wall_time": time.perf_counter() - start_time}
+            results.append((path, stats))
+
+        # Legs the graph cannot connect fall back to RRT*
+        missing = [i for i, (path, _) in enumerate(results) if path is None]
+        if missing:
+            print(f"{len(missing)} legs not connected by the {self.engine} graph, planning them with RRT*")
+            for i, result in zip(missing, self.run_rrt_star([legs[i] for i in missing], [seeds[i] for i in missing])):
+                results[i] = result
+        return results
+
+    def get_roadmap(self):
+        if self.roadmap is None:
+            self.roadmap = RM.Roadmap(self.collision_checker().polygon_points, self.boundary, collision_checker=self.collision_checker(), seed=self.seed)
+            self.roadmap.load_or_build()
+        return self.roadmap
+
+    def get_visibility_graph(self):
+        if self.visibility_graph is None:
+            self.visibility_graph = VG.VisibilityGraph(self.collision_checker().polygon_points, self.boundary, collision_checker=self.collision_checker())
+            self.visibility_graph.load_or_build()
+        return self.visibility_graph
+
+    def run_rrt_star(self, legs, seeds):
+        """Plan every (start, goal) leg with its own sampling planner run, sequentially or in a process pool."""
+        boundary = self.boundary
+        engine = self.sampling_engine()
+        if self.workers and self.workers > 1 and len(legs) > 1:
+            init_args = (BIM.plan, self.collision_backend, boundary, self.grid_resolution, self.robot_radius,
+                         self.simplify_tolerance)
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=PL.init_worker, initargs=init_args) as pool:
+                futures = [pool.submit(PL.plan_leg, start, goal, boundary, seed, self.planner_params, engine=engine)
+                           for (start, goal), seed in zip(legs, seeds)]
+                results = [future.result() for future in futures]
+        elif self.reuse_trees and engine == "rrt_star":
+            checker = self.collision_checker()
+            results = [PL.plan_leg_reusing(self.trees, start, goal, boundary, seed, self.planner_params,
+                                           collision_checker=checker, collision_cache=self.collision_cache)
+                       for (start, goal), seed in zip(legs, seeds)]
+        else:
+            # One prepared collision backend serves every planner of this plan
+            checker = self.collision_checker()
+            results = [PL.plan_leg(start, goal, boundary, seed, self.planner_params, engine=engine, collision_checker=checker,
+                                   collision_cache=self.collision_cache)
+                       for (start, goal), seed in zip(legs, seeds)]
+
+        for _, stats in results:
+            stats["engine"] = engine
+        return results
+
+    def sampling_engine(self):
+        # Graph engine legs that cannot be connected fall back to RRT*
+        return self.engine if self.engine in PL.PLANNERS else "rrt_star"
+
+    def segment_params(self):
+        # Everything besides the geometry that changes the shape of a planned segment
+        return cache.params_hash(self.engine, self.planner_params, self.collision_backend, self.grid_resolution, self.boundary,
+                                 self.robot_radius, self.simplify_tolerance)
+
+    def get_segment_cache(self):
+        if self.segment_cache is None:
+            self.segment_cache = cache.SegmentCache(CC.geometry_hash(BIM.plan))
+        return self.segment_cache
+
+    def collision_checker(self):
+        if self.checker is None:
+            self.checker = CC.make_collision_checker(BIM.plan, self.collision_backend, self.boundary, self.grid_resolution,
+                                                     self.robot_radius, self.simplify_tolerance)
+            if self.simplify_tolerance > 0:
+                pieces = self.checker.polygon_points
+                simplified = CC.simplify_obstacles(BIM.plan, self.simplify_tolerance)
+                print(f"Obstacles: {len(BIM.plan)} polygons with {CC.vertex_count(BIM.plan)} vertices, "
+                      f"{CC.vertex_count(simplified)} after merging and simplifying, "
+                      f"{CC.vertex_count(pieces)} in {len(pieces)} pieces after splitting; at most "
+                      f"{max(CC.vertex_count([piece]) for piece in pieces)} instead of "
+                      f"{max(CC.vertex_count([points]) for points in BIM.plan)} vertices per polygon")
+        return self.checker
+
+    def clearance_map(self):
+        """Distance-to-nearest-wall field of the (not inflated) floor plan, gives the clearance of every leg."""
+        if self.clearance is None:
+            self.clearance = CC.ClearanceMap(BIM.plan, self.boundary, self.grid_resolution)
+        return self.clearance
+
+    def stitch_section(self, leg_paths):
+        """Concatenate the legs of one path section in order, then smooth and store it."""
+        all_paths = list(leg_paths[0])
+        for path_segment in leg_paths[1:]:
+            all_paths.extend(path_segment[1:])
+
+        rrt_star_planner = LN.RRTStar(all_paths[0], all_paths[-1], [], self.boundary, collision_checker=self.collision_checker(),
+                                      collision_cache=self.collision_cache)
+        rrt_star_planner.set_obstacles(BIM.plan)
+        smoothed_path = rrt_star_planner.smooth_path(all_paths, mode=self.smoothing)
         
         # Store the smoothed path
         self.smoothed_paths.append(smoothed_path)
-        print()
-        print("--------------------------------------------")
-        print("Path section found, close window to continue")
-        print("--------------------------------------------")
-        print()
 
         # Plot the result
-        rrt_star_planner.plot_result(smoothed_path)
+        if self.plot:
+            print()
+            print("--------------------------------------------")
+            print("Path section found, close window to continue")
+            print("--------------------------------------------")
+            print()
+            rrt_star_planner.plot_result(smoothed_path)
 
         length_of_all_paths = rrt_star_planner.calculate_path_length(smoothed_path)
         print("Length of the smoothed path:", length_of_all_paths)
         return self.smoothed_paths
 
+    def run_lower_level_network(self, shortest_path, source_location, target_location):
+        legs = self.section_legs(shortest_path, source_location, target_location)
+        return self.stitch_section(self.plan_legs(legs))
+
     def run(self):
-        self.best_epsilon = self.define_epsilon()
-        self.schedule = self.calc_schedule(self.best_epsilon)
         self.load_coordinates()
+        if self.schedule_mode == "tour":
+            self.schedule = self.calc_tour()
+        else:
+            self.best_epsilon = self.define_epsilon()
+            self.schedule = self.calc_schedule(self.best_epsilon)
 
+        # Collect the legs of all schedule pairs first, so they can be planned concurrently
+        sections = []
         for i in range(len(self.schedule) - 1):
             current_schedule = [self.schedule[i], self.schedule[i + 1]]
             shortest_path, source_location, target_location = self.run_upper_level_network(current_schedule)
             if shortest_path:
-                self.run_lower_level_network(shortest_path, source_location, target_location)
-
-# Create an instance of NetworkPlanner
-planner = NetworkPlanner('assets/BIM.json')
-    
-# Run the planner
-planner.run()
-    
-# Access the smoothed paths
-smoothed_paths = planner.smoothed_paths
-   
-# Print or process the smoothed paths
-print("Smoothed Paths:", smoothed_paths)
-print()
-print("----------------------------------------------------------")
-print("Full path is planned, Press 'Start' to activate S.I.M.O.H.")
-print("----------------------------------------------------------")
-
-with open("assets/path.json", "w") as file:
-    json.dump(smoothed_paths, file)
\ No newline at end of file
+                sections.append(self.section_legs(shortest_path, source_location, target_location))
+
+        all_legs = [leg for legs in sections for leg in legs]
+        all_leg_paths = self.plan_legs(all_legs)
+        report = self.leg_report[len(self.leg_report) - len(all_legs):]
+
+        # Stitch the results back together in schedule order
+        offset = 0
+        for section, legs in enumerate(sections):
+            for leg in range(len(legs)):
+                report[offset + leg].update(section=section, leg=leg)
+            self.stitch_section(all_leg_paths[offset:offset + len(legs)])
+            offset += len(legs)
+
+    def print_report(self):
+        """Print the planning statistics of every leg and the totals."""
+        print(f"{'sec':>3} {'leg':>3} {'engine':>11} {'reached':>7} {'iter':>6} {'tree':>6} {'checks':>7} {'time [s]':>8} "
+              f"{'length':>8} {'clearance':>9}")
+        for row in self.leg_report:
+            print(f"{row.get('section', '-'):>3} {row.get('leg', '-'):>3} {row['engine']:>11} {'yes' if row['reached'] else 'NO':>7} "
+                  f"{row['iterations']:>6} {row['tree_size']:>6} {row['collision_checks']:>7} {row['wall_time']:>8.3f} "
+                  f"{row['path_length']:>8.1f} {row['min_clearance']:>9.1f}")
+        total_time = sum(row['wall_time'] for row in self.leg_report)
+        total_checks = sum(row['collision_checks'] for row in self.leg_report)
+        print(f"{len(self.leg_report)} legs, {total_checks} collision checks, {total_time:.3f} s planning time")
+        cache = self.collision_cache
+        print(f"Collision cache in this process: {cache.hits} hits, {cache.misses} misses ({cache.hit_rate():.0%} hit rate)")
+        unreached = self.unreached_legs()
+        if unreached:
+            legs = ", ".join(f"{row.get('section', '-')}/{row.get('leg', '-')}" for row in unreached)
+            print(f"Warning: {len(unreached)} legs did not reach their goal (section/leg {legs}), "
+                  f"the stitched path jumps across walls there")
+
+    def unreached_legs(self):
+        # A leg whose planner did not reach the goal returns only the goal, stitching then skips the gap
+        return [row for row in self.leg_report if not row['reached']]
+
+    def write_report(self, file_path):
+        """Append the per-leg statistics of this run to a CSV file, so planning cost can be tracked over time."""
+        fields = ["run", "section", "leg", "engine", "start", "goal", "door_nodes", "reached", "iterations",
+                  "tree_size", "collision_checks", "wall_time", "path_length", "min_clearance"]
+        run_id = datetime.now().isoformat(timespec="seconds")
+        new_file = not os.path.exists(file_path)
+        with open(file_path, "a", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+            if new_file:
+                writer.writeheader()
+            for row in self.leg_report:
+                writer.writerow(dict(row, run=run_id))
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan the full inspection route and write it to a path file.")
+    parser.add_argument("--headless", action="store_true", help="do not open a plot window for every path section")
+    parser.add_argument("--bim", default="assets/BIM.json", help="zone data of the BIM model")
+    parser.add_argument("--output", default="assets/path.json", help="file the planned path is written to")
+    parser.add_argument("--report", default=None, help="CSV file the per-leg planning report is appended to")
+    parser.add_argument("--engine", default="rrt_star", choices=list(PL.PLANNERS) + ["prm", "visibility"])
+    parser.add_argument("--collision-backend", default="geometry", choices=["geometry", "grid"])
+    parser.add_argument("--smoothing", default="greedy", choices=["greedy", "bisect"], help="shortcutting of the stitched path")
+    parser.add_argument("--robot-radius", type=float, default=0.0,
+                        help=f"inflate the walls by this radius, the Go2 footprint is {CC.GO2_FOOTPRINT_RADIUS}")
+    parser.add_argument("--simplify", type=float, default=0.0, metavar="TOLERANCE",
+                        help="merge, simplify and split the obstacles before indexing them")
+    parser.add_argument("--schedule", default="bandit", choices=["bandit", "tour"],
+                        help="order the zones by epsilon-greedy simulation or as a priority and travel cost aware tour")
+    parser.add_argument("--battery-budget", type=float, default=None,
+                        help="travel cost one charge allows in tour mode, zones are left out to stay within it")
+    parser.add_argument("--tuning-seeds", type=int, default=None,
+                        help="choose epsilon from up to this many seeds with confidence intervals instead of one run")
+    parser.add_argument("--no-epsilon-cache", action="store_true", help="run the epsilon search even if the risk profile is unchanged")
+    parser.add_argument("--workers", type=int, default=None, help="processes used to plan legs concurrently")
+    parser.add_argument("--reuse-trees", action="store_true",
+                        help="extend the RRT* tree of a door node for every later leg starting or ending there")
+    parser.add_argument("--seed", type=int, default=None, help="base seed for reproducible planning")
+    parser.add_argument("--no-segment-cache", action="store_true", help="plan every door-to-door segment again")
+    args = parser.parse_args()
+
+    # Create an instance of NetworkPlanner
+    planner = NetworkPlanner(args.bim, collision_backend=args.collision_backend, workers=args.workers, seed=args.seed,
+                             use_segment_cache=not args.no_segment_cache, engine=args.engine, plot=not args.headless,
+                             smoothing=args.smoothing, robot_radius=args.robot_radius, simplify_tolerance=args.simplify,
+                             reuse_trees=args.reuse_trees, schedule_mode=args.schedule,
+                             battery_budget=args.battery_budget, tuning_seeds=args.tuning_seeds,
+                             use_epsilon_cache=not args.no_epsilon_cache)
+        
+    # Run the planner
+    start_time = time.perf_counter()
+    planner.run()
+    print(f"Total planning time: {time.perf_counter() - start_time:.1f} s")
+        
+    # Access the smoothed paths
+    smoothed_paths = planner.smoothed_paths
+       
+    # Print or process the smoothed paths
+    print("Smoothed Paths:", smoothed_paths)
+    print()
+    planner.print_report()
+    if args.report:
+        planner.write_report(args.report)
+
+    with open(args.output, "w") as file:
+        json.dump(smoothed_paths, file)
+
+    # A non-zero exit status lets unattended runs detect a path that is not collision-free
+    if planner.unreached_legs():
+        return 1
+    print()
+    print("----------------------------------------------------------")
+    print("Full path is planned, Press 'Start' to activate S.I.M.O.H.")
+    print("----------------------------------------------------------")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
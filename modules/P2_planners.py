@@ -0,0 +1,47 @@
+import time
+import P2_collision as CC
+from P2_Lowerlevel_network import RRTStar, RRTConnect
+from P2_grid_planner import GridPlanner
+
+# Lower-level planners selectable by NetworkPlanner's engine parameter, all share the plan(smooth) call
+PLANNERS = {"rrt_star": RRTStar, "rrt_connect": RRTConnect, "jps": GridPlanner}
+
+# Collision backend and collision cache of a leg planning worker process, built once by init_worker
+_worker_checker = None
+_worker_cache = None
+
+def init_worker(obstacle, collision_backend, boundary, resolution, robot_radius=0.0, simplify_tolerance=0.0):
+    global _worker_checker, _worker_cache
+    _worker_checker = CC.make_collision_checker(obstacle, collision_backend, boundary, resolution, robot_radius,
+                                                simplify_tolerance)
+    _worker_cache = CC.CollisionCache()
+
+def plan_leg(start, goal, boundary, seed, params=None, smooth=False, engine="rrt_star", collision_checker=None,
+             collision_cache=None):
+    """Plan a single leg and return the path with its planning statistics.
+    In a worker process the collision backend and cache built by init_worker are used."""
+    planner = PLANNERS[engine](start, goal, [], boundary, collision_checker=collision_checker or _worker_checker,
+                               collision_cache=collision_cache or _worker_cache, seed=seed, **(params or {}))
+    start_time = time.perf_counter()
+    path = planner.plan(smooth=smooth)
+    stats = planner.stats()
+    stats["wall_time"] = time.perf_counter() - start_time
+    return path, stats
+
+def plan_leg_reusing(trees, start, goal, boundary, seed, params=None, smooth=False, collision_checker=None,
+                     collision_cache=None):
+    """Plan a leg with the RRT* tree kept in trees for one of its endpoints, so legs sharing a door node
+    extend the exploration done before instead of starting over. A tree rooted at the goal answers the
+    reversed leg. New trees are stored in trees under their root."""
+    reverse = tuple(start) not in trees and tuple(goal) in trees
+    root, target = (goal, start) if reverse else (start, goal)
+    planner = trees.get(tuple(root))
+    start_time = time.perf_counter()
+    if planner is None:
+        planner = RRTStar(root, target, [], boundary, collision_checker=collision_checker, collision_cache=collision_cache,
+                          seed=seed, **(params or {}))
+        trees[tuple(root)] = planner
+    path = planner.plan_to(target, smooth=smooth)
+    stats = planner.stats()
+    stats["wall_time"] = time.perf_counter() - start_time
+    return (path[::-1] if reverse else path), stats
@@ -0,0 +1,266 @@
+import heapq
+import math
+import json
+import argparse
+import time
+import numpy as np
+import P1_BIM as BIM
+import P2_collision as CC
+
+class DStarLite:
+    def __init__(self, grid, start, goal):
+        """D* Lite on an 8-connected occupancy grid (True is blocked), cells are (col, row).
+        The search runs from the goal towards the start, so when cells change only the vertices
+        whose cost is affected are expanded again instead of searching from scratch."""
+        self.grid = grid  # Shared with the owner, changes are announced through update_cells
+        self.rows, self.cols = grid.shape
+        self.start = start
+        self.goal = goal
+        self.g = {}
+        self.rhs = {goal: 0.0}
+        self.open_list = []
+        self.open_keys = {}  # Current key of every cell in the open list, older heap entries are stale
+        self.expansions = 0
+        self.push(goal, self.calculate_key(goal))
+
+    def walkable(self, cell):
+        return 0 <= cell[0] < self.cols and 0 <= cell[1] < self.rows and not self.grid.item(cell[1], cell[0])
+
+    def heuristic(self, a, b):
+        # Octile distance, consistent on the 8-connected grid
+        dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+        return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+    def cost(self, a, b):
+        """Edge cost between neighbouring cells, diagonal moves may not cut a blocked corner."""
+        if not (self.walkable(a) and self.walkable(b)):
+            return float('inf')
+        if a[0] != b[0] and a[1] != b[1]:
+            if not (self.walkable((b[0], a[1])) and self.walkable((a[0], b[1]))):
+                return float('inf')
+            return math.sqrt(2)
+        return 1.0
+
+    def neighbours(self, cell):
+        x, y = cell
+        return [(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                if (dx or dy) and 0 <= x + dx < self.cols and 0 <= y + dy < self.rows]
+
+    def calculate_key(self, cell):
+        value = min(self.g.get(cell, float('inf')), self.rhs.get(cell, float('inf')))
+        # Rounded, so float noise in the octile sums does not reorder equal keys
+        return (round(value + self.heuristic(self.start, cell), 9), round(value, 9))
+
+    def push(self, cell, key):
+        self.open_keys[cell] = key
+        heapq.heappush(self.open_list, (key, cell))
+
+    def update_vertex(self, cell):
+        if cell != self.goal:
+            rhs = float('inf')
+            if self.walkable(cell):
+                for s in self.neighbours(cell):
+                    # Edge costs are at least 1, only neighbours that could improve rhs are checked
+                    g = self.g.get(s, float('inf'))
+                    if g + 1.0 < rhs:
+                        rhs = min(rhs, self.cost(cell, s) + g)
+            self.rhs[cell] = rhs
+        self.open_keys.pop(cell, None)
+        if self.g.get(cell, float('inf')) != self.rhs.get(cell, float('inf')):
+            self.push(cell, self.calculate_key(cell))
+
+    def top_key(self):
+        # Drop heap entries that were superseded or removed
+        while self.open_list and self.open_keys.get(self.open_list[0][1]) != self.open_list[0][0]:
+            heapq.heappop(self.open_list)
+        return self.open_list[0][0] if self.open_list else (float('inf'), float('inf'))
+
+    def compute_shortest_path(self):
+        while (self.top_key() < self.calculate_key(self.start) or
+               self.rhs.get(self.start, float('inf')) != self.g.get(self.start, float('inf'))):
+            if not self.open_list:
+                break
+            k_old, cell = heapq.heappop(self.open_list)
+            del self.open_keys[cell]
+            self.expansions += 1
+            k_new = self.calculate_key(cell)
+            if k_old < k_new:
+                self.push(cell, k_new)
+            elif self.g.get(cell, float('inf')) > self.rhs.get(cell, float('inf')):
+                self.g[cell] = self.rhs[cell]
+                for s in self.neighbours(cell):
+                    self.update_vertex(s)
+            else:
+                self.g[cell] = float('inf')
+                for s in self.neighbours(cell) + [cell]:
+                    self.update_vertex(s)
+
+    def update_cells(self, cells):
+        """Announce cells whose blocked state changed in the grid. Every edge touching a changed
+        cell, or cutting its corner, has an endpoint in its 3x3 neighbourhood."""
+        affected = set()
+        for x, y in cells:
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    if 0 <= x + dx < self.cols and 0 <= y + dy < self.rows:
+                        affected.add((x + dx, y + dy))
+        for cell in affected:
+            self.update_vertex(cell)
+
+    def plan(self):
+        """Cell path from start to goal, None when the goal cannot be reached."""
+        self.compute_shortest_path()
+        if self.g.get(self.start, float('inf')) == float('inf'):
+            return None
+        cells = [self.start]
+        while cells[-1] != self.goal:
+            cell = cells[-1]
+            cells.append(min(self.neighbours(cell), key=lambda s: self.cost(cell, s) + self.g.get(s, float('inf'))))
+            if self.cost(cell, cells[-1]) == float('inf') or len(cells) > self.rows * self.cols:
+                return None
+        return cells
+
+class RouteRepair:
+    def __init__(self, path_file="assets/path.json", boundary=(0, 3000, 0, 2000), resolution=5.0, robot_radius=0.0):
+        """Temporary obstacles (pallets, closed corridors) registered next to BIM.plan during a run.
+        Only the parts of the planned route that they block are replanned, with D* Lite searches
+        that are kept per blocked gap and updated incrementally when further obstacles appear."""
+        self.path_file = path_file
+        self.boundary = boundary  # boundary = (x_min, x_max, y_min, y_max)
+        self.resolution = resolution
+        self.robot_radius = robot_radius
+        walls = CC.inflate_obstacles(BIM.plan, robot_radius) if robot_radius > 0 else BIM.plan
+        self.occupancy = CC.OccupancyGrid(walls, boundary, resolution)
+        self.static_grid = self.occupancy.grid
+        self.occupancy.grid = self.static_grid.copy()  # Walls and temporary obstacles
+        self.temporary = []  # Point lists of the temporary obstacles
+        self.blocking = None  # Collision checker of the temporary obstacles only
+        self.searches = {}  # (start cell, goal cell) -> DStarLite of a repaired gap
+        self.route = []  # Route as planned, every repair starts from it so the blocked gaps stay the same
+        self.paths = []  # Route with the current detours
+
+    def load(self):
+        with open(self.path_file, "r") as file:
+            self.route = json.load(file)
+        self.paths = [list(path) for path in self.route]
+        return self.paths
+
+    def save(self, file_path=None):
+        with open(file_path or self.path_file, "w") as file:
+            json.dump(self.paths, file)
+
+    def add_obstacle(self, points):
+        """Register a temporary obstacle given as a point list like the entries of BIM.plan."""
+        self.temporary.append(points)
+        self.update_grid()
+
+    def remove_obstacle(self, points):
+        self.temporary.remove(points)
+        self.update_grid()
+
+    def update_grid(self):
+        # Rasterize the temporary obstacles again and pass the changed cells to every kept search
+        obstacles = self.temporary
+        if self.robot_radius > 0 and obstacles:
+            obstacles = CC.inflate_obstacles(obstacles, self.robot_radius)
+        grid = self.static_grid | self.occupancy.rasterize(obstacles) if obstacles else self.static_grid.copy()
+        rows, cols = np.nonzero(grid != self.occupancy.grid)
+        self.occupancy.grid[:] = grid
+        self.blocking = CC.CollisionChecker(obstacles) if obstacles else None
+        changed = list(zip(cols.tolist(), rows.tolist()))
+        for search in self.searches.values():
+            search.update_cells(changed)
+
+    def is_blocked(self, p1, p2):
+        return self.blocking is not None and not self.blocking.is_collision_free(p1, p2)
+
+    def detour(self, start, goal):
+        """Free path between two waypoints around the temporary obstacles, None if there is none."""
+        start_cell = self.occupancy.nearest_free(self.occupancy.point_cell(start))
+        goal_cell = self.occupancy.nearest_free(self.occupancy.point_cell(goal))
+        if start_cell is None or goal_cell is None:
+            return None
+        key = (start_cell, goal_cell)
+        if key not in self.searches:
+            self.searches[key] = DStarLite(self.occupancy.grid, start_cell, goal_cell)
+        cells = self.searches[key].plan()
+        if cells is None:
+            return None
+
+        # Keep only the cells where the detour has to turn to stay clear of the grid obstacles
+        points = [list(start)] + [self.occupancy.cell_point(cell) for cell in cells[1:-1]] + [list(goal)]
+        detour = [points[0]]
+        i = 0
+        while i < len(points) - 1:
+            j = len(points) - 1
+            while j > i + 1 and not self.occupancy.is_collision_free(points[i], points[j]):
+                j -= 1
+            detour.append(points[j])
+            i = j
+        return detour
+
+    def blocked_runs(self, path):
+        """Index ranges (i, j) such that waypoints i and j are free and the route between them is blocked."""
+        runs = []
+        k = 0
+        while k < len(path) - 1:
+            if not self.is_blocked(path[k], path[k + 1]):
+                k += 1
+                continue
+            i, j = k, k + 1
+            # Waypoints inside an obstacle are dropped as well
+            while i > (runs[-1][1] if runs else 0) and self.is_blocked(path[i], path[i]):
+                i -= 1
+            while j < len(path) - 1 and self.is_blocked(path[j], path[j]):
+                j += 1
+            runs.append((i, j))
+            k = j
+        return runs
+
+    def repair(self, sections=None):
+        """Replace the blocked parts of the planned route by detours and return the indices of the
+        sections that could not be repaired. sections limits the repair, e.g. to the ones not driven yet.
+        A gap that was repaired before reuses its D* Lite search, updated with the changed cells."""
+        unrepaired = []
+        for s in (range(len(self.route)) if sections is None else sections):
+            path = self.route[s]
+            repaired = []
+            last = 0
+            for i, j in self.blocked_runs(path):
+                detour = None
+                if not (self.is_blocked(path[i], path[i]) or self.is_blocked(path[j], path[j])):
+                    detour = self.detour(path[i], path[j])
+                if detour is None:
+                    unrepaired.append(s)
+                    break
+                repaired.extend(path[last:i])
+                repaired.extend(detour[:-1])
+                last = j
+            else:
+                self.paths[s] = repaired + list(path[last:])
+        return unrepaired
+
+def main():
+    parser = argparse.ArgumentParser(description="Repair a planned route around temporary obstacles.")
+    parser.add_argument("--path", default="assets/path.json", help="route written by P2_main_path_planning")
+    parser.add_argument("--output", default=None, help="file the repaired route is written to, default overwrites --path")
+    parser.add_argument("--box", type=float, nargs=4, action="append", default=[], metavar=("X_MIN", "Y_MIN", "X_MAX", "Y_MAX"),
+                        help="temporary rectangular obstacle, can be given several times")
+    parser.add_argument("--robot-radius", type=float, default=0.0)
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    repair = RouteRepair(args.path, robot_radius=args.robot_radius)
+    repair.load()
+    for x_min, y_min, x_max, y_max in args.box:
+        repair.add_obstacle([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]])
+    unrepaired = repair.repair()
+    repair.save(args.output)
+    expansions = sum(search.expansions for search in repair.searches.values())
+    print(f"Repaired {len(repair.searches)} blocked gaps with {expansions} D* Lite expansions "
+          f"in {time.perf_counter() - start_time:.2f} s")
+    if unrepaired:
+        print(f"No detour found for sections {unrepaired}, a full replan is needed")
+
+if __name__ == "__main__":
+    main()
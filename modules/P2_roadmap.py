@@ -0,0 +1,121 @@
+import numpy as np
+import networkx as nx
+import math
+import os
+from scipy.spatial import cKDTree
+import P1_BIM as BIM
+import P2_collision as CC
+from P2_cache import CACHE_DIR, params_hash
+
+class Roadmap:
+    def __init__(self, obstacle, boundary, n_samples=4000, k_neighbors=12, collision_checker=None, seed=None,
+                 extra_points=None):
+        """Probabilistic roadmap (PRM) over the free space of the floor plan."""
+        self.obstacle = obstacle
+        self.boundary = boundary  # boundary = (x_min, x_max, y_min, y_max)
+        self.n_samples = n_samples
+        self.k_neighbors = k_neighbors
+        self.collision = collision_checker or CC.CollisionChecker(obstacle)
+        self.rng = np.random.default_rng(seed)
+        # Door nodes are always part of the roadmap so narrow doorways stay connected
+        self.extra_points = extra_points if extra_points is not None else list(BIM.nodes.values())
+
+        self.points = np.empty((0, 2))
+        self.edges = np.empty((0, 2), dtype=int)
+        self.graph = None
+        self.kdtree = None
+        self.collision_checks = 0  # Collision checks spent answering queries
+
+    def build(self):
+        """Sample collision-free points and connect each to its k nearest visible neighbours."""
+        x_min, x_max, y_min, y_max = self.boundary
+        samples = [list(point) for point in self.extra_points if self.collision.is_point_free(point)]
+        while len(samples) < self.n_samples:
+            point = [self.rng.uniform(x_min, x_max), self.rng.uniform(y_min, y_max)]
+            if self.collision.is_point_free(point):
+                samples.append(point)
+        self.points = np.array(samples)
+
+        kdtree = cKDTree(self.points)
+        _, neighbours = kdtree.query(self.points, k=min(self.k_neighbors + 1, len(self.points)))
+        edges = set()
+        for i, row in enumerate(neighbours):
+            for j in row[1:]:
+                edge = (min(i, j), max(i, j))
+                if edge not in edges and self.collision.is_collision_free(self.points[i], self.points[j]):
+                    edges.add(edge)
+        self.edges = np.array(sorted(edges), dtype=int).reshape(-1, 2)
+        self.make_graph()
+        return self
+
+    def make_graph(self):
+        self.kdtree = cKDTree(self.points)
+        self.graph = nx.Graph()
+        self.graph.add_nodes_from(range(len(self.points)))
+        weights = np.linalg.norm(self.points[self.edges[:, 0]] - self.points[self.edges[:, 1]], axis=1)
+        self.graph.add_weighted_edges_from(zip(self.edges[:, 0].tolist(), self.edges[:, 1].tolist(), weights.tolist()))
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        np.savez_compressed(file_path, points=self.points, edges=self.edges)
+
+    def load(self, file_path):
+        data = np.load(file_path)
+        self.points = data["points"]
+        self.edges = data["edges"]
+        self.make_graph()
+        return self
+
+    def cache_file(self):
+        key = params_hash(CC.geometry_hash(self.obstacle), self.boundary, self.n_samples, self.k_neighbors,
+                          [list(point) for point in self.extra_points])
+        return os.path.join(CACHE_DIR, f"roadmap_{key}.npz")
+
+    def load_or_build(self):
+        """Load the roadmap stored for this geometry and these parameters, or build and store it."""
+        file_path = self.cache_file()
+        if os.path.exists(file_path):
+            return self.load(file_path)
+        self.build()
+        self.save(file_path)
+        return self
+
+    def connect(self, point):
+        # Visible roadmap nodes closest to an arbitrary query point
+        k = min(self.k_neighbors, len(self.points))
+        distances, indices = self.kdtree.query(point, k=k)
+        return [(int(i), float(d)) for i, d in zip(np.atleast_1d(indices), np.atleast_1d(distances))
+                if self.is_collision_free(point, self.points[i])]
+
+    def is_collision_free(self, p1, p2):
+        self.collision_checks += 1
+        return self.collision.is_collision_free(p1, p2)
+
+    def query(self, start, goal):
+        """Shortest roadmap path from start to goal, None if they cannot be connected."""
+        if self.is_collision_free(start, goal):
+            return [list(start), list(goal)]
+
+        start_links = self.connect(start)
+        goal_links = self.connect(goal)
+        if not start_links or not goal_links:
+            return None
+
+        # Temporary query nodes, removed again once the search is done
+        graph = self.graph
+        graph.add_weighted_edges_from(("start", i, d) for i, d in start_links)
+        graph.add_weighted_edges_from(("goal", i, d) for i, d in goal_links)
+
+        def heuristic(u, v):
+            pu = start if u == "start" else goal if u == "goal" else self.points[u]
+            pv = start if v == "start" else goal if v == "goal" else self.points[v]
+            return math.hypot(pu[0] - pv[0], pu[1] - pv[1])
+
+        try:
+            nodes = nx.astar_path(graph, "start", "goal", heuristic=heuristic, weight="weight")
+        except nx.NetworkXNoPath:
+            return None
+        finally:
+            graph.remove_nodes_from(["start", "goal"])
+
+        return [list(start)] + [self.points[i].tolist() for i in nodes[1:-1]] + [list(goal)]
@@ -0,0 +1,94 @@
+import numpy as np
+
+def zone_priorities(coordinates, hazard_weight=0.5):
+    """Priority of every zone in BIM.json order: its risk_factor plus the weighted amount_of_hazards,
+    scaled so the zone with the most hazards adds hazard_weight."""
+    zones = list(coordinates.values())
+    risk = np.array([zone["risk_factor"] for zone in zones], dtype=float)
+    hazards = np.array([zone["amount_of_hazards"] for zone in zones], dtype=float)
+    if hazards.max() > 0:
+        hazards = hazards / hazards.max()
+    return risk + hazard_weight * hazards
+
+def travel_cost_matrix(locations, locator, analyzer):
+    """Zone-to-zone travel costs over the door graph: zone to its door, door to door along the
+    shortest path, door to the other zone. Zones that see each other directly use the straight line."""
+    locations = np.asarray(locations, dtype=float)
+    nearest = locator.find_k_nearest(locations, k=1, reachable=True)
+    doors, door_distances = [], []
+    for location, found in zip(locations, nearest):
+        node, _, distance = found[0] if found else locator.find_closest_node(location.tolist())
+        doors.append(analyzer.index[node])
+        door_distances.append(distance)
+    door_distances = np.array(door_distances)
+
+    analyzer.compute_all_pairs()
+    costs = door_distances[:, None] + analyzer.distances[np.ix_(doors, doors)] + door_distances[None, :]
+    if locator.collision is not None:
+        for i in range(len(locations)):
+            for j in range(i + 1, len(locations)):
+                if locator.collision.is_collision_free(locations[i].tolist(), locations[j].tolist()):
+                    costs[i, j] = costs[j, i] = min(costs[i, j], np.linalg.norm(locations[i] - locations[j]))
+    np.fill_diagonal(costs, 0.0)
+    return costs
+
+class TourOptimizer:
+    def __init__(self, costs, priorities, start=None, budget=None):
+        """Visiting order of the zones as a closed tour from and back to start.
+        Zones are added by priority-weighted nearest insertion while the tour length stays within the
+        budget (the travel cost one battery charge allows, None visits every zone with a priority),
+        then the order is shortened with 2-opt, which may free budget for more zones."""
+        self.costs = np.asarray(costs, dtype=float)
+        self.priorities = np.asarray(priorities, dtype=float)
+        self.start = int(np.argmax(self.priorities)) if start is None else start
+        self.budget = budget
+
+    def tour_cost(self, tour):
+        return float(self.costs[tour[:-1], tour[1:]].sum())
+
+    def insert(self, tour):
+        """Insert zones one by one, the best priority per extra travel cost first."""
+        cost = self.tour_cost(tour)
+        remaining = [zone for zone in range(len(self.priorities)) if zone not in tour and self.priorities[zone] > 0]
+        while remaining:
+            zones = np.array(remaining)
+            # Extra cost of inserting every remaining zone between every pair of consecutive tour stops
+            a, b = np.array(tour[:-1]), np.array(tour[1:])
+            extra = self.costs[a][:, zones] + self.costs[zones][:, b].T - self.costs[a, b][:, None]
+            positions = np.argmin(extra, axis=0)
+            extra = extra[positions, np.arange(len(zones))]
+            affordable = np.isfinite(extra) if self.budget is None else cost + extra <= self.budget
+            if not affordable.any():
+                break
+            # Costs with straight-line shortcuts break the triangle inequality, an insertion may shorten the tour
+            score = np.where(affordable, self.priorities[zones] / (np.maximum(extra, 0) + 1e-9), -np.inf)
+            best = int(np.argmax(score))
+            tour.insert(int(positions[best]) + 1, int(zones[best]))
+            cost += extra[best]
+            remaining.remove(int(zones[best]))
+        return tour
+
+    def two_opt(self, tour):
+        """Reverse tour segments as long as that shortens the tour, the start stays in place."""
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, len(tour) - 2):
+                # Gain of reversing tour[i:j + 1] for every j at once
+                j = np.arange(i + 1, len(tour) - 1)
+                gain = (self.costs[tour[i - 1], tour[i]] + self.costs[np.array(tour)[j], np.array(tour)[j + 1]] -
+                        self.costs[tour[i - 1], np.array(tour)[j]] - self.costs[tour[i], np.array(tour)[j + 1]])
+                best = int(np.argmax(gain))
+                if gain[best] > 1e-9:
+                    tour[i:j[best] + 1] = tour[i:j[best] + 1][::-1]
+                    improved = True
+        return tour
+
+    def optimize(self):
+        """Closed tour as a list of zone indices, starting and ending at the start zone."""
+        tour = [self.start, self.start]
+        while True:
+            size = len(tour)
+            tour = self.two_opt(self.insert(tour))
+            if len(tour) == size:
+                return tour
@@ -0,0 +1,52 @@
+import numpy as np
+import os
+from shapely.geometry.polygon import orient
+import P2_collision as CC
+from P2_cache import CACHE_DIR, params_hash
+from P2_roadmap import Roadmap
+
+class VisibilityGraph(Roadmap):
+    def __init__(self, obstacle, boundary, clearance=5.0, collision_checker=None):
+        """Visibility graph over the inflated convex corners of the obstacles, queried with A*.
+        Shortest paths in a polygonal floor plan bend only at these corners, so the result is
+        deterministic and needs no separate smoothing of the leg itself."""
+        super().__init__(obstacle, boundary, n_samples=0, collision_checker=collision_checker, extra_points=[])
+        self.clearance = clearance  # Distance kept from the wall corners
+
+    def corners(self):
+        # Convex corners of every obstacle, pushed outwards by the clearance
+        x_min, x_max, y_min, y_max = self.boundary
+        corners = []
+        for points in self.obstacle:
+            inflated = CC.to_polygon(points).buffer(self.clearance, join_style="mitre")
+            for polygon in getattr(inflated, "geoms", [inflated]):
+                # Oriented so the obstacle lies left of every ring, holes (enclosed rooms) included
+                polygon = orient(polygon)
+                for ring in [polygon.exterior] + list(polygon.interiors):
+                    ring = np.asarray(ring.coords)[:-1]
+                    previous, following = np.roll(ring, 1, axis=0), np.roll(ring, -1, axis=0)
+                    cross = ((ring[:, 0] - previous[:, 0]) * (following[:, 1] - ring[:, 1]) -
+                             (ring[:, 1] - previous[:, 1]) * (following[:, 0] - ring[:, 0]))
+                    for point in ring[cross > 0]:
+                        if x_min <= point[0] <= x_max and y_min <= point[1] <= y_max and self.collision.is_point_free(point):
+                            corners.append(point.tolist())
+        return corners
+
+    def build(self):
+        """Connect every pair of mutually visible corners."""
+        self.points = np.array(self.corners()).reshape(-1, 2)
+        edges = [(i, j) for i in range(len(self.points)) for j in range(i + 1, len(self.points))
+                 if self.collision.is_collision_free(self.points[i], self.points[j])]
+        self.edges = np.array(edges, dtype=int).reshape(-1, 2)
+        self.make_graph()
+        return self
+
+    def cache_file(self):
+        key = params_hash(CC.geometry_hash(self.obstacle), self.boundary, self.clearance)
+        return os.path.join(CACHE_DIR, f"visibility_{key}.npz")
+
+    def connect(self, point):
+        # Every visible corner is a candidate, not only the nearest ones
+        distances = np.linalg.norm(self.points - np.asarray(point, dtype=float), axis=1)
+        return [(i, float(distances[i])) for i in np.argsort(distances).tolist()
+                if self.is_collision_free(point, self.points[i])]